@@ -0,0 +1,184 @@
+"""
+Benchmark parsing, interpreting, and rendering synthetic songs.
+
+Songs are generated from a fixed seed and scaled along one parameter at a time, like
+`--scale tracks=1,4,16`. Each stage is timed separately and reported as notes per
+second and, for rendering, seconds of audio per wall-clock second. Run with `--json`
+for machine-readable output.
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import time
+import warnings
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, replace
+
+import numpy as np
+from lark.tree import Meta
+
+import arpeggio
+from arpeggio.arp_ast import Config
+from arpeggio.engine.cache import waveform_cache
+from arpeggio.interpreter import interpret
+from arpeggio.parser import Parser
+
+INSTRUMENTS = ["sine", "square", "sawtooth", "triangle"]
+SYMBOLS_PER_LINE = 16
+
+
+@dataclass(frozen=True)
+class SongParams:
+    """The dimensions of a synthetic song."""
+
+    tracks: int = 4
+    notes: int = 256
+    repeat: int = 4
+    bpm: int = 120
+    sample_rate: int = 11_025
+    chord_density: float = 0.25
+    seed: int = 0
+
+
+def generate_song(params: SongParams) -> str:
+    """
+    Generate the source of a song with random notes, rests, and held notes.
+
+    Each track has `notes` symbols split into lines that each repeat `repeat` times,
+    and a `chord_density` fraction of tracks play chords.
+    """
+    rng = random.Random(params.seed)
+    lines = [f"@bpm {params.bpm}", ""]
+
+    for i in range(params.tracks):
+        lines += ["track", f"    @instrument {INSTRUMENTS[i % len(INSTRUMENTS)]}"]
+        if rng.random() < params.chord_density:
+            lines.append("    @chords")
+
+        for start in range(0, params.notes, SYMBOLS_PER_LINE):
+            symbols = [
+                rng.choice(["1", "2", "3", "4", "5", "6", "7", "1+", "5-", ".", "&"])
+                for _ in range(min(SYMBOLS_PER_LINE, params.notes - start))
+            ]
+            # Lines can't start by continuing a note
+            if symbols[0] == ".":
+                symbols[0] = "1"
+            repeat = f" [x{params.repeat}]" if params.repeat > 1 else ""
+            lines.append(f"    | {' '.join(symbols)}{repeat}")
+
+        lines += ["end", ""]
+
+    return "\n".join(lines)
+
+
+def _time(run: Callable[[], object], repeat: int) -> float:
+    """Return the median wall time of a function, starting with a cold cache."""
+    times = []
+    for _ in range(repeat):
+        waveform_cache.clear()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    return statistics.median(times)
+
+
+def benchmark(params: SongParams, repeat: int = 3) -> dict:
+    """Time each stage of rendering a synthetic song."""
+    source = generate_song(params)
+    parser = Parser()
+    parsed = parser.parse(source)
+    # The sample rate can't be written in source, so set it on the parsed song
+    parsed.config["sample_rate"] = Config(Meta(), "sample_rate", params.sample_rate)
+    song = interpret(parsed)
+
+    n_notes = sum(len(track.events) for track in song.tracks)
+    audio_seconds = max(track.n_samples for track in song.tracks) / song.sample_rate
+
+    seconds = {
+        "parse": _time(lambda: parser.parse(source), repeat),
+        "interpret": _time(lambda: interpret(parsed), repeat),
+        "track_render": _time(
+            lambda: [track.render() for track in interpret(parsed).tracks], repeat
+        ),
+        "song_render": _time(lambda: interpret(parsed).render(), repeat),
+    }
+    # Rendering also interprets the song, so don't count that twice
+    seconds["track_render"] -= seconds["interpret"]
+    seconds["song_render"] -= seconds["interpret"]
+
+    return {
+        "params": asdict(params),
+        "notes": n_notes,
+        "audio_seconds": audio_seconds,
+        "seconds": seconds,
+        "notes_per_second": {
+            stage: n_notes / elapsed for stage, elapsed in seconds.items()
+        },
+        "audio_seconds_per_second": {
+            stage: audio_seconds / seconds[stage]
+            for stage in ["track_render", "song_render"]
+        },
+    }
+
+
+def _parse_scale(value: str) -> tuple[str, list[float]]:
+    name, _, values = value.partition("=")
+    if name not in SongParams.__dataclass_fields__:
+        raise argparse.ArgumentTypeError(f"Unknown song parameter {name!r}.")
+
+    cast = type(getattr(SongParams(), name))
+    return name, [cast(v) for v in values.split(",")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--scale",
+        type=_parse_scale,
+        default=("tracks", [1, 4, 16]),
+        metavar="PARAM=V1,V2,...",
+        help="The song parameter to scale and the values to use.",
+    )
+    parser.add_argument("-n", "--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Output JSON.")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    name, values = args.scale
+    results = [
+        benchmark(replace(SongParams(), **{name: value}), repeat=args.repeat)
+        for value in values
+    ]
+
+    if args.json:
+        environment = {
+            "arpeggio": arpeggio.__version__,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+        }
+        print(json.dumps({"environment": environment, "results": results}, indent=2))
+        return
+
+    stages = list(results[0]["seconds"])
+    print(f"{name:>14}{'notes':>9}" + "".join(f"{s:>14}" for s in stages))
+    for result in results:
+        row = f"{result['params'][name]:>14}{result['notes']:>9}"
+        row += "".join(f"{result['notes_per_second'][s]:>12.0f}/s" for s in stages)
+        print(row)
+
+    print(f"\n{name:>14}{'audio':>9}{'track_render':>14}{'song_render':>14}")
+    for result in results:
+        speed = result["audio_seconds_per_second"]
+        print(
+            f"{result['params'][name]:>14}{result['audio_seconds']:>8.1f}s"
+            f"{speed['track_render']:>13.1f}x{speed['song_render']:>13.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark the startup time of the Arpeggio CLI and parser.
+
+Each case is run in a fresh Python process, so import and grammar construction costs
+are included. Run with `--json` for machine-readable output.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TINY_SONG = "track\n| 1 2 3 4\nend\n"
+
+
+def _cases(workdir: Path) -> dict[str, list[str]]:
+    source = workdir / "tiny.arp"
+    source.write_text(TINY_SONG)
+    output = workdir / "tiny.wav"
+
+    return {
+        "import": ["-c", "import arpeggio"],
+        "help": ["-m", "arpeggio", "--help"],
+        "parser": ["-c", "from arpeggio.parser import Parser; Parser().parse('')"],
+        "compile": ["-m", "arpeggio", "compile", str(source), str(output)],
+    }
+
+
+def _time(args: list[str], repeat: int) -> list[float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-W", "ignore", *args],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        times.append(time.perf_counter() - start)
+
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Output JSON.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cases = _cases(Path(workdir))
+        # Run once to populate the grammar cache and bytecode
+        _time(cases["parser"], repeat=1)
+        results = {
+            name: statistics.median(_time(case, args.repeat))
+            for name, case in cases.items()
+        }
+
+    if args.json:
+        print(json.dumps({"startup_seconds": results}, indent=2))
+        return
+
+    for name, seconds in results.items():
+        print(f"{name:<10}{seconds * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
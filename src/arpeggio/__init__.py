@@ -2,9 +2,34 @@
 An interpreter for converting Arpeggio source code to audio.
 """
 
-from arpeggio import arp_ast as ast
-from arpeggio import engine, interpreter, parser
+import importlib
 
-__all__ = ["engine", "parser", "interpreter", "ast"]
+__all__ = ["engine", "parser", "interpreter", "ast", "render_async", "start_render"]
 
 __version__ = "0.1.0"
+
+# Submodules are imported on first access, so that importing the package doesn't
+# pay for heavy dependencies like numpy, pydub, and pydantic until they're needed.
+_submodules = {
+    "engine": "arpeggio.engine",
+    "parser": "arpeggio.parser",
+    "interpreter": "arpeggio.interpreter",
+    "ast": "arpeggio.arp_ast",
+}
+_functions = {
+    "render_async": "arpeggio.aio",
+    "start_render": "arpeggio.aio",
+}
+
+
+def __getattr__(name: str):
+    if name in _submodules:
+        return importlib.import_module(_submodules[name])
+    if name in _functions:
+        return getattr(importlib.import_module(_functions[name]), name)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return [*globals(), *__all__]
@@ -1,13 +1,81 @@
-import argparse
-import os
-from collections.abc import Callable
+from __future__ import annotations
 
-from watchdog.events import FileModifiedEvent, FileSystemEventHandler
-from watchdog.observers import Observer
+import argparse
+import sys
+from functools import partial
+from typing import TYPE_CHECKING, BinaryIO, Literal
 
 from arpeggio.exceptions import SourceError
-from arpeggio.interpreter import interpret
-from arpeggio.parser import Parser
+
+if TYPE_CHECKING:
+    from arpeggio.engine.cache import TrackCache
+    from arpeggio.watch import Cycle
+
+# Heavy dependencies like watchdog, numpy, and pydub are imported where they're
+# used, so that commands like `--help` start quickly.
+
+
+def _add_jobs_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Render up to N tracks in parallel.",
+    )
+
+
+def _add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print the time and memory used by each stage and track.",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Write a Chrome trace of the profile to FILE. Implies --profile.",
+    )
+
+
+def _add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--cache-dir",
+        metavar="DIR",
+        help="Cache rendered tracks in DIR, and reuse them across runs.",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=1024,
+        metavar="MIB",
+        help="Evict the least recently used tracks beyond this size. Default: 1024.",
+    )
+
+
+def _get_cache(args: argparse.Namespace) -> TrackCache | None:
+    """Return a disk cache if a directory was given, or a memory cache to watch."""
+    if args.cache_dir:
+        from arpeggio.engine.cache import DiskTrackCache
+
+        return DiskTrackCache(args.cache_dir, max_bytes=args.cache_size * 2**20)
+
+    # In watch mode, keep rendered tracks so that only changed tracks are re-rendered
+    if getattr(args, "watch", False):
+        from arpeggio.engine.cache import TrackCache
+
+        return TrackCache()
+    return None
+
+
+def _add_sample_rate_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--sample-rate",
+        type=int,
+        metavar="HZ",
+        help="Override the sample rate set by the song.",
+    )
 
 
 def _parse_play(command_parser) -> argparse.ArgumentParser:
@@ -16,6 +84,15 @@ def _parse_play(command_parser) -> argparse.ArgumentParser:
     parser.add_argument(
         "-w", "--watch", action="store_true", help="Re-play on file change."
     )
+    parser.add_argument(
+        "--preview",
+        action="store_true",
+        help="Play a quick, low-fidelity mono preview at a reduced sample rate.",
+    )
+    _add_sample_rate_argument(parser)
+    _add_cache_arguments(parser)
+    _add_jobs_argument(parser)
+    _add_profile_arguments(parser)
     return parser
 
 
@@ -24,10 +101,74 @@ def _parse_compile(command_parser) -> argparse.ArgumentParser:
         "compile", help="Compile an Arpeggio file to WAV"
     )
     parser.add_argument("source", help="Arpeggio file to interpret")
-    parser.add_argument("output", help="Output file to write")
+    parser.add_argument("output", help="Output file to write, or - for stdout")
     parser.add_argument(
         "-w", "--watch", action="store_true", help="Re-compile on file change."
     )
+    parser.add_argument(
+        "--format",
+        choices=["wav", "raw"],
+        default="wav",
+        help="Write a WAV file, or raw interleaved stereo 16-bit PCM.",
+    )
+    _add_sample_rate_argument(parser)
+    _add_cache_arguments(parser)
+    _add_jobs_argument(parser)
+    _add_profile_arguments(parser)
+    return parser
+
+
+def _parse_compile_batch(command_parser) -> argparse.ArgumentParser:
+    parser = command_parser.add_parser(
+        "compile-batch", help="Compile many Arpeggio files to WAV"
+    )
+    parser.add_argument(
+        "sources", nargs="+", help="Arpeggio files, directories, or glob patterns"
+    )
+    parser.add_argument(
+        "-o", "--output-dir", required=True, help="Directory to write WAV files to"
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Compile up to N files in parallel. Defaults to one per CPU.",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="Recompile files even if their output is up to date.",
+    )
+    _add_cache_arguments(parser)
+    return parser
+
+
+def _parse_serve(command_parser) -> argparse.ArgumentParser:
+    parser = command_parser.add_parser(
+        "serve", help="Serve renders over localhost HTTP"
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Address to listen on (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="Port to listen on (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=4,
+        metavar="N",
+        help="Render up to N requests at once. Others wait in a queue.",
+    )
     return parser
 
 
@@ -42,73 +183,168 @@ def _parse_args() -> argparse.Namespace:
     )
     _parse_play(command_parser)
     _parse_compile(command_parser)
+    _parse_compile_batch(command_parser)
+    _parse_serve(command_parser)
 
     return parser.parse_args()
 
 
-class WatchedFileHandler(FileSystemEventHandler):
-    def __init__(self, modified_callback):
-        self.modified_callback = modified_callback
-        self.last_modified = 0.0
+def _render_file(
+    path: str,
+    output: str | None = None,
+    jobs: int = 1,
+    cache: TrackCache | None = None,
+    output_format: Literal["wav", "raw"] = "wav",
+    sample_rate: int | None = None,
+    preview: bool = False,
+    profile: bool = False,
+    trace: str | None = None,
+    cycle: Cycle | None = None,
+):
+    render = partial(
+        _render_source,
+        path,
+        output=output,
+        jobs=jobs,
+        cache=cache,
+        output_format=output_format,
+        sample_rate=sample_rate,
+        preview=preview,
+        cycle=cycle,
+    )
+    if not (profile or trace):
+        render()
+        return
 
-    def on_modified(self, event: FileModifiedEvent) -> None:
-        # File changes trigger two events. Use mtime to dedupe
-        modified = os.stat(event.src_path).st_mtime
-        if modified == self.last_modified:
-            return
+    from arpeggio.profiling import profile as start_profile
 
-        self.last_modified = modified
-        self.modified_callback()
+    with start_profile() as profiler:
+        render()
 
+    # Keep the summary out of stdout, which may be carrying audio
+    print(profiler.summary(), file=sys.stderr)
+    if trace:
+        profiler.write_trace(trace)
+        print(f"Wrote trace to {trace}.", file=sys.stderr)
 
-def _watch_file(path: str, *, callback: Callable[[], None]):
-    event_handler = WatchedFileHandler(modified_callback=callback)
-    observer = Observer()
-    observer.schedule(event_handler, path=path, event_filter=[FileModifiedEvent])
-    observer.start()
 
-    print(f"Watching {path} for changes (CTRL + C to exit)...")
-    try:
-        while observer.is_alive():
-            observer.join(1.0)
-    except KeyboardInterrupt:
-        # TODO: If the thread is playing, just interrupt it instead of exiting.
-        observer.stop()
-        print("Exiting...")
-    finally:
-        observer.stop()
-        observer.join()
-
-
-def _render_file(path: str, output: str | None = None):
+def _render_source(
+    path: str,
+    output: str | None = None,
+    jobs: int = 1,
+    cache: TrackCache | None = None,
+    output_format: Literal["wav", "raw"] = "wav",
+    sample_rate: int | None = None,
+    preview: bool = False,
+    cycle: Cycle | None = None,
+):
+    """
+    Render a file to an output or play it.
+
+    In watch mode, the `cycle` is checked between stages and while synthesizing,
+    so that a newer version of the file can cancel the render.
+    """
+    from arpeggio.interpreter import interpret
+    from arpeggio.parser import Parser
+
+    check = cycle.check if cycle else None
     with open(path) as f:
         source = f.read()
 
     try:
         ast = Parser().parse(source, filename=path)
-        song = interpret(ast, filename=path)
+        if check:
+            check()
+        song = interpret(ast, filename=path, sample_rate=sample_rate, preview=preview)
     except SourceError as e:
-        print(e)
+        print(e, file=sys.stderr)
         return
 
+    if cache is not None:
+        # Forget tracks that were removed or changed since the last render
+        cache.retain(
+            track.fingerprint for track in song.tracks if track.fingerprint is not None
+        )
+
     if output:
-        song.render().export(output, format="wav")
+        # Stream to stdout so renders can be piped into other tools
+        file: str | BinaryIO = sys.stdout.buffer if output == "-" else output
+        song.export(
+            file, workers=jobs, cache=cache, format=output_format, progress=check
+        )
+        if cycle:
+            cycle.finish(f"Wrote {output}")
         return
 
-    song.play()
+    player = None
+    if cycle:
+        from arpeggio.engine.playback import StreamPlayer, default_sink
+
+        player = cycle.play_with(StreamPlayer(default_sink()))
+
+    stats = song.play(workers=jobs, cache=cache, player=player, progress=check)
+    if check:
+        # Playback that was stopped by a newer version isn't worth reporting on
+        check()
+    if stats.underruns:
+        print(f"Playback underran {stats.underruns} time(s) while synthesizing.")
+
+
+def _compile_batch(args: argparse.Namespace) -> int:
+    from arpeggio.batch import FAILED, compile_batch
+
+    counts: dict[str, int] = {}
+    try:
+        for result in compile_batch(
+            args.sources,
+            args.output_dir,
+            jobs=args.jobs,
+            force=args.force,
+            cache=_get_cache(args),
+        ):
+            print(result)
+            counts[result.status] = counts.get(result.status, 0) + 1
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        return 1
+
+    print(", ".join(f"{count} {status}" for status, count in counts.items()))
+    return 1 if counts.get(FAILED) else 0
 
 
 def main() -> None:
     args = _parse_args()
+    if args.command == "compile-batch":
+        sys.exit(_compile_batch(args))
+    if args.command == "serve":
+        from arpeggio.server import serve
+
+        serve(host=args.host, port=args.port, workers=args.jobs)
+        return
+
     output = args.output if args.command == "compile" else None
+    cache = _get_cache(args)
 
-    def render():
-        _render_file(path=args.source, output=output)
+    def render(cycle: Cycle | None = None):
+        _render_file(
+            path=args.source,
+            output=output,
+            jobs=args.jobs,
+            cache=cache,
+            output_format=getattr(args, "format", "wav"),
+            sample_rate=args.sample_rate,
+            preview=getattr(args, "preview", False),
+            profile=args.profile,
+            trace=args.trace,
+            cycle=cycle,
+        )
 
-    # Run once, then start watching
-    render()
     if args.watch:
-        _watch_file(path=args.source, callback=render)
+        from arpeggio.watch import watch_file
+
+        watch_file(args.source, render=render)
+    else:
+        render()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,171 @@
+"""
+Render songs from asyncio without blocking the event loop.
+
+Rendering runs in an executor, so the event loop stays responsive:
+
+    wav = await arpeggio.render_async(source, timeout=10)
+
+To follow progress, start a render and iterate over its updates before awaiting
+the result:
+
+    render = arpeggio.start_render(source)
+    async for progress in render:
+        print(f"{progress.stage}: {progress.fraction:.0%}")
+    wav = await render
+
+Cancelling a render, or timing out, stops synthesis within one block rather than
+abandoning it in the background.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import io
+import threading
+from collections.abc import AsyncIterator, Generator
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Literal
+
+Stage = Literal["parse", "interpret", "render", "done"]
+
+
+@dataclass(frozen=True)
+class Progress:
+    """An update on the progress of a render."""
+
+    stage: Stage
+    """The stage that is running."""
+
+    fraction: float = 0.0
+    """The fraction of the stage that is complete, from 0 to 1."""
+
+
+class RenderCancelled(Exception):
+    """Raised in the worker to stop a cancelled render."""
+
+
+class RenderTask:
+    """
+    A song rendering in an executor.
+
+    Iterate over the task for progress updates, and await it for the rendered audio
+    bytes. Cancelling the task, or the coroutine awaiting it, stops the render the
+    next time the worker checks in, which happens between stages and after every
+    mixed block.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        *,
+        filename: str = "<stdin>",
+        format: Literal["wav", "raw"] = "wav",
+        sample_rate: int | None = None,
+        preview: bool = False,
+        block_size: int = 2**14,
+        executor: Executor | None = None,
+    ):
+        self.source = source
+        self.filename = filename
+        self.format = format
+        self.sample_rate = sample_rate
+        self.preview = preview
+        self.block_size = block_size
+
+        self._loop = asyncio.get_running_loop()
+        self._stop = threading.Event()
+        self._updates: asyncio.Queue[Progress | None] = asyncio.Queue()
+        self._future = self._loop.run_in_executor(executor, self._run)
+        # The loop runs done callbacks, so the queue is only touched by the loop
+        self._future.add_done_callback(lambda _: self._updates.put_nowait(None))
+
+    def cancel(self) -> None:
+        """Stop the render. Awaiting the task then raises `CancelledError`."""
+        self._stop.set()
+
+    def cancelled(self) -> bool:
+        """Return true if the render was asked to stop."""
+        return self._stop.is_set()
+
+    def done(self) -> bool:
+        """Return true if the worker has finished, stopped, or failed."""
+        return self._future.done()
+
+    def __await__(self) -> Generator[object, None, bytes]:
+        return self._wait().__await__()
+
+    async def __aiter__(self) -> AsyncIterator[Progress]:
+        while (progress := await self._updates.get()) is not None:
+            yield progress
+
+    async def _wait(self) -> bytes:
+        try:
+            # Shield the worker, so that cancelling the waiter can stop it cleanly
+            return await asyncio.shield(self._future)
+        except asyncio.CancelledError:
+            self.cancel()
+            # Don't return until the worker has actually stopped. Its outcome no
+            # longer matters
+            with contextlib.suppress(Exception):
+                await asyncio.shield(self._future)
+            raise
+        except RenderCancelled:
+            raise asyncio.CancelledError from None
+
+    def _report(self, stage: Stage, fraction: float = 0.0) -> None:
+        """Report progress from the worker, raising if the render was cancelled."""
+        if self._stop.is_set():
+            raise RenderCancelled
+        self._loop.call_soon_threadsafe(
+            self._updates.put_nowait, Progress(stage, fraction)
+        )
+
+    def _run(self) -> bytes:
+        from arpeggio.interpreter import interpret
+        from arpeggio.parser import Parser
+
+        self._report("parse")
+        parsed = Parser().parse(self.source, filename=self.filename)
+
+        self._report("interpret")
+        song = interpret(
+            parsed,
+            filename=self.filename,
+            sample_rate=self.sample_rate,
+            preview=self.preview,
+        )
+
+        self._report("render")
+        file = io.BytesIO()
+        song.export(
+            file,
+            block_size=self.block_size,
+            format=self.format,
+            progress=lambda done, total: self._report("render", done / total),
+        )
+
+        self._report("done", 1.0)
+        return file.getvalue()
+
+
+def start_render(source: str, **kwargs) -> RenderTask:
+    """
+    Start rendering a song in an executor and return the running task.
+
+    Keyword arguments are passed to `RenderTask`. This must be called from a running
+    event loop.
+    """
+    return RenderTask(source, **kwargs)
+
+
+async def render_async(source: str, *, timeout: float | None = None, **kwargs) -> bytes:
+    """
+    Render a song to WAV bytes without blocking the event loop.
+
+    Keyword arguments are passed to `RenderTask`. If rendering takes longer than
+    `timeout` seconds, it's stopped and `asyncio.TimeoutError` is raised. Errors in
+    the source are raised as `SourceError`.
+    """
+    return await asyncio.wait_for(start_render(source, **kwargs)._wait(), timeout)
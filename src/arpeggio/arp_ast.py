@@ -1,14 +1,18 @@
+import hashlib
 import sys
 from dataclasses import dataclass
+from fractions import Fraction
 
 from lark import Transformer, ast_utils, v_args
 from lark.tree import Meta
 
 
+@dataclass
 class Continue(ast_utils.Ast):
     """A marker to continue the previous note."""
 
 
+@dataclass
 class Rest(ast_utils.Ast):
     """A marker to rest for a note."""
 
@@ -31,12 +35,32 @@ class Config(ast_utils.Ast, ast_utils.WithMeta):
     value: float | int | str | bool = True
 
 
+@dataclass
+class Line:
+    """A pattern of symbols and their durations, played one or more times."""
+
+    symbols: list[tuple[Interval | Rest, Fraction]]
+    repeat: int = 1
+
+
 @dataclass
 class Track(ast_utils.Ast):
     """A track with configuration and lines."""
 
     config: dict[str, Config]
-    lines: list[list[Interval | Continue | Rest]]
+    lines: list[Line]
+
+    def fingerprint(self, **context) -> str:
+        """
+        Return a hash of the track's configuration and lines.
+
+        Any other settings that affect how the track sounds, like the song tempo,
+        should be passed as keyword arguments. Source positions are ignored, so
+        moving a track within a file doesn't change its fingerprint.
+        """
+        config = {key: config.value for key, config in self.config.items()}
+        content = repr((sorted(config.items()), self.lines, sorted(context.items())))
+        return hashlib.sha256(content.encode()).hexdigest()
 
 
 @dataclass
@@ -62,28 +86,27 @@ class _ToAst(Transformer):
 
     @v_args(inline=True)
     def repeat(self, n):
-        return int(n)
+        # `[x0]` has always played the pattern once, like leaving the repeat out
+        return max(int(n), 1)
 
     @v_args(inline=True)
-    def line(self, symbols, repeat=0):
-        from fractions import Fraction
-
-        if repeat:
-            symbols *= repeat
-
+    def line(self, symbols, repeat=1):
         default_duration = Fraction(1, 16)
         # TODO: Refactor this
-        symbol_durations: list[list[Interval | Continue | Rest | Fraction]] = []
+        symbol_durations: list[tuple[Interval | Rest, Fraction]] = []
         for s in symbols:
             if isinstance(s, Continue):
                 if not symbol_durations:
                     raise ValueError("Cannot continue without a previous note.")
-                symbol_durations[-1][1] += default_duration
+                symbol, duration = symbol_durations[-1]
+                symbol_durations[-1] = (symbol, duration + default_duration)
 
             else:
-                symbol_durations.append([s, default_duration])
+                symbol_durations.append((s, default_duration))
 
-        return symbol_durations
+        # Repeats are kept as a count rather than copied, so large repeat counts
+        # cost no more to parse or interpret than a single pattern
+        return Line(symbol_durations, repeat)
 
     def config_dict(self, configs: list[Config]) -> dict[str, Config]:
         config = {}
@@ -0,0 +1,158 @@
+"""Compile many Arpeggio files to WAV at once."""
+
+from __future__ import annotations
+
+import glob
+import os
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from arpeggio.exceptions import SourceError
+
+if TYPE_CHECKING:
+    from arpeggio.engine.cache import TrackCache
+
+COMPILED = "compiled"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+@dataclass
+class BatchResult:
+    """The outcome of compiling one file in a batch."""
+
+    source: Path
+    output: Path
+    status: str
+    """One of `compiled`, `skipped`, or `failed`."""
+
+    error: str | None = None
+    """The error that stopped a failed file from compiling."""
+
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        if self.status == FAILED:
+            return f"{self.status:<9} {self.source}\n{self.error}"
+        if self.status == SKIPPED:
+            return f"{self.status:<9} {self.source} (up to date)"
+        return f"{self.status:<9} {self.source} -> {self.output} ({self.seconds:.2f}s)"
+
+
+def find_sources(patterns: Iterable[str]) -> list[tuple[Path, Path]]:
+    """
+    Find the files matched by paths, directories, and glob patterns.
+
+    Returns each source with its output path, relative to the output directory.
+    Directories are searched recursively for `.arp` files, and glob patterns are
+    matched from the directory before their first wildcard. The structure below
+    either is mirrored in the output paths. Raises `ValueError` if two sources
+    would be compiled to the same output.
+    """
+    sources = {}
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            for source in sorted(path.rglob("*.arp")):
+                sources[source] = source.relative_to(path).with_suffix(".wav")
+            continue
+
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches:
+            raise FileNotFoundError(f"No files match {pattern!r}.")
+        root = _glob_root(path)
+        for match in matches:
+            sources[Path(match)] = Path(match).relative_to(root).with_suffix(".wav")
+
+    outputs: dict[Path, Path] = {}
+    for source, output in sources.items():
+        if output in outputs:
+            raise ValueError(
+                f"{outputs[output]} and {source} would both be compiled to {output}."
+            )
+        outputs[output] = source
+
+    return list(sources.items())
+
+
+def _glob_root(pattern: Path) -> Path:
+    """Return the directory that a glob pattern starts matching from."""
+    parts: list[str] = []
+    for part in pattern.parts:
+        if any(c in part for c in "*?["):
+            return Path(*parts)
+        parts.append(part)
+    # Without wildcards, the pattern is a single file
+    return pattern.parent
+
+
+def is_up_to_date(source: Path, output: Path) -> bool:
+    """Return true if an output exists and is newer than its source."""
+    return output.exists() and output.stat().st_mtime >= source.stat().st_mtime
+
+
+def compile_batch(
+    patterns: Iterable[str],
+    output_dir: str | Path,
+    jobs: int | None = None,
+    force: bool = False,
+    cache: TrackCache | None = None,
+) -> Iterator[BatchResult]:
+    """
+    Compile every matched source to WAV in an output directory.
+
+    Files are compiled in parallel across `jobs` processes, or one per CPU by
+    default. Each process keeps one parser and waveform cache for every file it
+    compiles. Files with errors are reported and skipped, and outputs that are newer
+    than their sources aren't recompiled unless `force` is set. Results are yielded
+    in the order that sources were found.
+
+    With a disk cache, tracks that any process has already rendered are loaded
+    instead of synthesized.
+    """
+    output_dir = Path(output_dir)
+    tasks = []
+    for source, relative_output in find_sources(patterns):
+        output = output_dir / relative_output
+        if not force and is_up_to_date(source, output):
+            yield BatchResult(source, output, SKIPPED)
+        else:
+            tasks.append((source, output))
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(tasks) <= 1:
+        yield from (_compile(source, output, cache) for source, output in tasks)
+        return
+
+    sources, outputs = zip(*tasks, strict=True)
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+        yield from executor.map(_compile, sources, outputs, [cache] * len(tasks))
+
+
+def _compile(source: Path, output: Path, cache: TrackCache | None) -> BatchResult:
+    """Compile one file, reusing the parser and caches of this process."""
+    from arpeggio.interpreter import interpret
+    from arpeggio.parser import Parser
+
+    start = time.perf_counter()
+    # Write to a temporary file first, so an interrupted compile never leaves an
+    # output that looks up to date
+    partial = output.with_name(output.name + ".part")
+    try:
+        song = interpret(Parser().parse(source.read_text(), filename=str(source)))
+        output.parent.mkdir(parents=True, exist_ok=True)
+        song.export(str(partial), cache=cache)
+        partial.replace(output)
+    except SourceError as e:
+        return BatchResult(source, output, FAILED, error=str(e))
+    except Exception as e:
+        # Any other failure is still specific to this file, so report it and let
+        # the rest of the batch continue
+        partial.unlink(missing_ok=True)
+        return BatchResult(source, output, FAILED, error=f"{type(e).__name__}: {e}")
+
+    return BatchResult(source, output, COMPILED, seconds=time.perf_counter() - start)
@@ -2,7 +2,7 @@
 The audio engine that powers arpeggio's music generation.
 """
 
-from arpeggio.engine import note
+from arpeggio.engine import cache, note
 from arpeggio.engine.instrument import Instrument, get_instrument
 from arpeggio.engine.key import Key, get_mode
 from arpeggio.engine.note import Note
@@ -18,4 +18,5 @@ __all__ = [
     "get_mode",
     "get_instrument",
     "note",
+    "cache",
 ]
@@ -1,6 +1,229 @@
+import struct
+from collections.abc import Iterable, Iterator
+from typing import BinaryIO
+
 import numpy as np
 from pydub import AudioSegment
-from pydub.utils import get_min_max_value
+from pydub.utils import db_to_float, get_min_max_value, ratio_to_db
+
+from arpeggio import profiling
+
+
+def to_segment(
+    samples: np.ndarray, sample_rate: int, channels: int = 1
+) -> AudioSegment:
+    """Convert an array of 16-bit samples to an audio segment."""
+    return AudioSegment(
+        samples.astype(np.int16).tobytes(),
+        frame_rate=sample_rate,
+        sample_width=2,
+        channels=channels,
+    )
+
+
+def samples_of(segment: AudioSegment) -> np.ndarray:
+    """Return a read-only view of a segment's 16-bit samples, without copying."""
+    return np.frombuffer(segment.raw_data, dtype=np.int16)
+
+
+def peak_of(samples: np.ndarray) -> float:
+    """Return the largest absolute sample value, without allocating a copy."""
+    if not len(samples):
+        return 0.0
+    return float(max(-samples.min(), samples.max()))
+
+
+class MixBus:
+    """
+    A float32 buffer that sums signals in place.
+
+    Signals are added directly to the bus without intermediate copies, and the bus
+    is only converted back to 16-bit samples once, after everything is mixed.
+    Summed 16-bit samples stay exact in float32 for up to 256 full-scale signals.
+    """
+
+    def __init__(self, n_samples: int):
+        self.samples = np.zeros(n_samples, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def add(
+        self,
+        samples: np.ndarray,
+        gains: np.ndarray | None = None,
+        *,
+        start: int = 0,
+        repeat: int = 1,
+    ) -> None:
+        """
+        Add samples to the bus. Samples past the end are ignored.
+
+        With `gains`, the samples are mono and are added to each interleaved
+        channel of the bus, scaled by that channel's gain.
+
+        Samples are added `start` frames into the bus, and `repeat` times back to
+        back. Repeats are read from the same samples, so looped material is never
+        copied, and mixing takes time in proportion to the frames added.
+        """
+        if not len(samples):
+            return
+
+        if gains is None:
+            channels = [(self.samples, samples)]
+        else:
+            channels = [
+                (self.samples[channel :: len(gains)], samples * np.float32(gain))
+                for channel, gain in enumerate(gains)
+            ]
+
+        for bus, signal in channels:
+            for offset in range(start, start + repeat * len(signal), len(signal)):
+                n = min(len(signal), len(bus) - offset)
+                if n <= 0:
+                    break
+                target = bus[offset : offset + n]
+                np.add(target, signal[:n], out=target)
+
+    @property
+    def peak(self) -> float:
+        """The largest absolute value on the bus."""
+        return peak_of(self.samples)
+
+    def normalize(self, peak: float | None = None) -> np.ndarray:
+        """
+        Return the bus as 16-bit samples, normalizing as needed to prevent clipping.
+
+        The bus is scaled in place, so it shouldn't be used afterwards.
+        """
+        return normalize(self.samples, peak=peak, out=self.samples)
+
+
+def pan_gains(pan: float) -> np.ndarray:
+    """
+    Return the left and right gains that pan a mono signal, like AudioSegment.pan.
+
+    The channel being panned towards is boosted by up to 3 dB, and the other is
+    reduced, so that perceived loudness stays constant.
+    """
+    max_boost_db = ratio_to_db(2.0)
+    boost_db = abs(pan) * max_boost_db
+    reduce_db = ratio_to_db(db_to_float(max_boost_db) - db_to_float(boost_db))
+
+    # Speakers don't sum to a full 6 dB, so only boost by half
+    boost_db /= 2
+    gains = (boost_db, reduce_db) if pan < 0 else (reduce_db, boost_db)
+    return np.array([db_to_float(gain) for gain in gains], dtype=np.float32)
+
+
+def normalize(
+    samples: np.ndarray, peak: float | None = None, out: np.ndarray | None = None
+) -> np.ndarray:
+    """
+    Convert summed samples to 16-bit, normalizing as needed to prevent clipping.
+
+    Signals that would clip are scaled down so that their peak is full scale. When
+    normalizing one block of a longer signal, pass the peak of the full signal so
+    that every block is scaled consistently. Float samples can be scaled in place
+    by passing them as `out`.
+    """
+    if peak is None:
+        peak = peak_of(samples)
+
+    _, max_val = get_min_max_value(16)
+    if peak > max_val:
+        samples = np.multiply(samples, np.float32(max_val / peak), out=out)
+        out = samples
+    if samples.dtype.kind == "f":
+        # Round whether or not the samples were scaled, since truncating would bias
+        # quiet mixes toward zero
+        samples = np.rint(samples, out=out)
+
+    return samples.astype(np.int16)
+
+
+def wav_header(n_frames: int, sample_rate: int, channels: int = 2) -> bytes:
+    """Return the header of a 16-bit PCM WAV file with a known number of frames."""
+    block_align = channels * 2
+    data_size = n_frames * block_align
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + data_size,
+        b"WAVE",
+        b"fmt ",
+        16,  # Size of the format chunk
+        1,  # PCM format
+        channels,
+        sample_rate,
+        sample_rate * block_align,
+        block_align,
+        16,  # Bits per sample
+        b"data",
+        data_size,
+    )
+
+
+def write_wav(
+    file: str | BinaryIO,
+    blocks: Iterable[np.ndarray],
+    *,
+    n_frames: int,
+    sample_rate: int,
+    channels: int = 2,
+) -> None:
+    """
+    Write blocks of 16-bit samples to a WAV file as they are generated.
+
+    The number of frames is written to the header before any samples, so only one
+    block is held in memory at a time and the file never needs to be seeked. That
+    allows writing to pipes, like stdout.
+    """
+    write_pcm(file, blocks, header=wav_header(n_frames, sample_rate, channels=channels))
+
+
+def resample(
+    blocks: Iterable[np.ndarray], *, from_rate: int, to_rate: int, channels: int = 2
+) -> Iterator[np.ndarray]:
+    """
+    Resample blocks of interleaved samples by repeating or dropping frames.
+
+    This is much cheaper than interpolating, at the cost of aliasing, so it's only
+    suitable for previews. Frame positions are tracked across blocks, so the output
+    is the same however the input is split into blocks.
+    """
+
+    def first_frame(n_in: int) -> int:
+        # The first output frame at or after an input frame
+        return -(-n_in * to_rate // from_rate)
+
+    n_in = 0
+    for block in blocks:
+        frames = block.reshape(-1, channels)
+        start, stop = first_frame(n_in), first_frame(n_in + len(frames))
+        indices = np.arange(start, stop) * from_rate // to_rate - n_in
+        n_in += len(frames)
+        yield frames[indices].reshape(-1)
+
+
+def write_pcm(
+    file: str | BinaryIO, blocks: Iterable[np.ndarray], header: bytes = b""
+) -> None:
+    """
+    Write blocks of samples as raw little-endian 16-bit PCM, after an optional header.
+
+    Each block's buffer is written directly, without copying it to bytes.
+    """
+    if isinstance(file, str):
+        with open(file, "wb") as f:
+            write_pcm(f, blocks, header=header)
+        return
+
+    file.write(header)
+    for block in blocks:
+        with profiling.span("write"):
+            file.write(np.ascontiguousarray(block, dtype="<i2").data)
+    file.flush()
 
 
 def normalized_overlay(segments: list[AudioSegment]) -> AudioSegment:
@@ -12,25 +235,12 @@ def normalized_overlay(segments: list[AudioSegment]) -> AudioSegment:
 
     If no segments are passed or all segments are empty, returns silence.
     """
-    max_segment_length = (
-        int(max([len(segment._data) / segment.sample_width for segment in segments]))
-        if segments
-        else 0
-    )
-
+    max_segment_length = max([len(samples_of(s)) for s in segments], default=0)
     if max_segment_length == 0:
         return AudioSegment.silent(0)
 
-    # Use int to prevent overflow
-    output = np.zeros(max_segment_length, dtype=int)
-
+    bus = MixBus(max_segment_length)
     for segment in segments:
-        segment_array = np.array(segment.get_array_of_samples())
-        output[: len(segment_array)] += segment_array
-
-    min_val, max_val = get_min_max_value(16)
-
-    if output.max() > max_val or output.min() < min_val:
-        output = np.interp(output, (output.min(), output.max()), (min_val, max_val))
+        bus.add(samples_of(segment))
 
-    return segments[0]._spawn(output.astype(np.int16).tobytes())
+    return segments[0]._spawn(bus.normalize().tobytes())
@@ -0,0 +1,244 @@
+"""Caches of synthesized waveforms and rendered tracks."""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from arpeggio import __version__
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    entries: int
+    nbytes: int
+    max_bytes: int
+
+
+class WaveformCache:
+    """
+    A least-recently-used cache of synthesized waveforms, bounded by memory.
+
+    Cached waveforms are read-only, since the same array is shared by every note that
+    hits the cache. Waveforms larger than the memory limit are never cached.
+    """
+
+    def __init__(self, max_bytes: int = 128 * 2**20):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._nbytes = 0
+        self._entries: OrderedDict[Hashable, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __reduce__(self):
+        # Waveforms are only shared within a process, so instruments sent to worker
+        # processes use an empty cache there, or that process's shared cache
+        if self is waveform_cache:
+            return _shared_waveform_cache, ()
+        return type(self), (self.max_bytes,)
+
+    def info(self) -> CacheInfo:
+        """Return hit and miss counts and the current size of the cache."""
+        return CacheInfo(
+            hits=self.hits,
+            misses=self.misses,
+            entries=len(self._entries),
+            nbytes=self._nbytes,
+            max_bytes=self.max_bytes,
+        )
+
+    def get(self, key: Hashable, synthesize: Callable[[], np.ndarray]) -> np.ndarray:
+        """Return the waveform for a key, synthesizing and caching it on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+
+        waveform = synthesize()
+        waveform.flags.writeable = False
+        self._put(key, waveform)
+        return waveform
+
+    def resize(self, max_bytes: int) -> None:
+        """Change the memory limit, evicting waveforms as needed."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        """Remove all waveforms and reset the hit and miss counts."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def _put(self, key: Hashable, waveform: np.ndarray) -> None:
+        if waveform.nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = waveform
+            self._nbytes += waveform.nbytes
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used waveforms until the cache fits its limit."""
+        while self._nbytes > self.max_bytes:
+            _, waveform = self._entries.popitem(last=False)
+            self._nbytes -= waveform.nbytes
+
+
+class TrackCache:
+    """
+    Rendered track audio, keyed by a fingerprint of each track's source.
+
+    Songs rendered with a track cache only synthesize tracks whose fingerprints
+    aren't already cached.
+    """
+
+    def __init__(self):
+        self._tracks: dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return fingerprint in self._tracks
+
+    def get(self, fingerprint: str) -> np.ndarray | None:
+        """Return the rendered samples for a fingerprint, if cached."""
+        return self._tracks.get(fingerprint)
+
+    def put(self, fingerprint: str, samples: np.ndarray) -> None:
+        """Store the rendered samples of a track."""
+        samples.flags.writeable = False
+        self._tracks[fingerprint] = samples
+
+    def retain(self, fingerprints: Iterable[str]) -> None:
+        """Remove every track that doesn't match one of the given fingerprints."""
+        keep = set(fingerprints)
+        self._tracks = {k: v for k, v in self._tracks.items() if k in keep}
+
+
+class DiskTrackCache(TrackCache):
+    """
+    Rendered track audio stored on disk, shared between processes and runs.
+
+    Each track is stored as a `.npy` file named by a hash of its fingerprint and the
+    arpeggio version, and is memory-mapped when loaded rather than read into memory.
+    When the files exceed `max_bytes`, the least recently used are deleted. Entries
+    are shared by every song that uses the directory, so `retain` doesn't remove
+    them.
+    """
+
+    def __init__(self, directory: str | os.PathLike, max_bytes: int = 2**30):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries())
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return self._path(fingerprint).exists()
+
+    def info(self) -> CacheInfo:
+        """Return the current size of the cache. Hits and misses aren't counted."""
+        entries = self._entries()
+        return CacheInfo(
+            hits=0,
+            misses=0,
+            entries=len(entries),
+            nbytes=sum(size for _, size, _ in entries),
+            max_bytes=self.max_bytes,
+        )
+
+    def get(self, fingerprint: str) -> np.ndarray | None:
+        """Return the memory-mapped samples for a fingerprint, if cached."""
+        path = self._path(fingerprint)
+        try:
+            samples = np.load(path, mmap_mode="r")
+            # Mark the entry as recently used
+            os.utime(path)
+        except (OSError, ValueError):
+            # Missing, evicted by another process, or not fully written
+            return None
+        return samples
+
+    def put(self, fingerprint: str, samples: np.ndarray) -> None:
+        """Store the rendered samples of a track, evicting old tracks as needed."""
+        samples.flags.writeable = False
+        if samples.nbytes > self.max_bytes:
+            return
+
+        # Write to a temporary file first, so other processes never load a partial
+        # entry
+        with tempfile.NamedTemporaryFile(
+            dir=self.directory, suffix=".tmp", delete=False
+        ) as f:
+            np.save(f, samples)
+        os.replace(f.name, self._path(fingerprint))
+        self._evict()
+
+    def retain(self, fingerprints: Iterable[str]) -> None:
+        """Keep every entry, since other songs may use them."""
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        for path, _, _ in self._entries():
+            with contextlib.suppress(FileNotFoundError):
+                path.unlink()
+
+    def _path(self, fingerprint: str) -> Path:
+        key = hashlib.sha256(f"{__version__}:{fingerprint}".encode()).hexdigest()
+        return self.directory / f"{key}.npy"
+
+    def _entries(self) -> list[tuple[Path, int, float]]:
+        """Return the path, size, and last use of each entry."""
+        entries = []
+        for path in self.directory.glob("*.npy"):
+            with contextlib.suppress(FileNotFoundError):
+                stat = path.stat()
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits its limit."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        nbytes = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if nbytes <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                path.unlink()
+            nbytes -= size
+
+
+waveform_cache = WaveformCache()
+"""The cache shared by all instruments by default."""
+
+
+def _shared_waveform_cache() -> WaveformCache:
+    return waveform_cache
@@ -0,0 +1,110 @@
+"""A compact, array-backed representation of the notes in a track."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from arpeggio.engine.note import Chord, Note
+
+TICKS_PER_WHOLE = 192
+"""The resolution of event times. A sixteenth note lasts 12 ticks."""
+
+MAX_CHORD_SIZE = 3
+"""The number of frequency columns in an event table."""
+
+
+@dataclass
+class EventTable:
+    """
+    The notes and chords of a track, stored as struct-of-arrays columns.
+
+    Times are measured in ticks from the start of the track. Rests aren't stored as
+    events, but are implied by the gaps between events and by the table length.
+    Volume and pan apply to a whole track, so they're applied when tracks are
+    mixed rather than stored per event. Event tables can be inspected, transformed,
+    and cached without synthesizing any audio.
+    """
+
+    start: np.ndarray
+    """The start time of each event, in ticks."""
+
+    duration: np.ndarray
+    """The duration of each event, in ticks."""
+
+    frequency: np.ndarray
+    """The frequencies of each event, with one column per chord note."""
+
+    chord_size: np.ndarray
+    """The number of notes in each event. Unused frequency columns are NaN."""
+
+    length: int = 0
+    """The length of the table in ticks, including any trailing rests."""
+
+    def __len__(self) -> int:
+        """The number of events in the table."""
+        return len(self.start)
+
+    @classmethod
+    def empty(cls) -> EventTable:
+        """Return a table with no events."""
+        return cls(
+            start=np.zeros(0, dtype=np.int64),
+            duration=np.zeros(0, dtype=np.int64),
+            frequency=np.zeros((0, MAX_CHORD_SIZE)),
+            chord_size=np.zeros(0, dtype=np.int8),
+        )
+
+    @classmethod
+    def concatenate(cls, tables: list[EventTable]) -> EventTable:
+        """Join tables end to end, shifting each by the length of those before it."""
+        if not tables:
+            return cls.empty()
+
+        offsets = np.cumsum([0] + [table.length for table in tables[:-1]])
+        return cls(
+            start=np.concatenate(
+                [
+                    table.start + offset
+                    for table, offset in zip(tables, offsets, strict=True)
+                ]
+            ),
+            duration=np.concatenate([table.duration for table in tables]),
+            frequency=np.concatenate([table.frequency for table in tables]),
+            chord_size=np.concatenate([table.chord_size for table in tables]),
+            length=int(sum(table.length for table in tables)),
+        )
+
+    def __getitem__(self, index: slice) -> EventTable:
+        """Return a table with a slice of the events, and the same length."""
+        return EventTable(
+            start=self.start[index],
+            duration=self.duration[index],
+            frequency=self.frequency[index],
+            chord_size=self.chord_size[index],
+            length=self.length,
+        )
+
+    def tile(self, count: int) -> EventTable:
+        """Return a table that plays this table's events `count` times in a row."""
+        return EventTable.concatenate([self] * count)
+
+    def playable(self, i: int) -> Note | Chord:
+        """Return the note or chord played by an event."""
+        if self.chord_size[i] == 1:
+            return Note(self.frequency[i, 0])
+        return Chord([Note(f) for f in self.frequency[i, : self.chord_size[i]]])
+
+
+def ticks_to_samples(ticks: np.ndarray | int, *, bpm: int, sample_rate: int):
+    """
+    Convert tick times to whole sample offsets.
+
+    The conversion uses exact integer arithmetic and always rounds down, so it
+    matches converting the equivalent note durations.
+    """
+    # A whole note lasts four beats
+    return (np.asarray(ticks, dtype=np.int64) * 4 * 60 * sample_rate) // (
+        bpm * TICKS_PER_WHOLE
+    )
@@ -1,87 +1,275 @@
 """Instruments for synthesizing signals from notes and chords."""
 
-import random
-from abc import ABC
+from abc import ABC, abstractmethod
 
+import numpy as np
 from pydub import AudioSegment
-from pydub.generators import Sawtooth as SawtoothGenerator
-from pydub.generators import SignalGenerator
-from pydub.generators import Sine as SineGenerator
-from pydub.generators import Square as SquareGenerator
-from pydub.generators import Triangle as TriangleGenerator
-from pydub.generators import WhiteNoise as WhiteNoiseGenerator
-
-from arpeggio.engine.audio import normalized_overlay
-from arpeggio.engine.note import Chord, Note
+from pydub.utils import db_to_float, get_min_max_value
 
-# Initialize the RNG to generate reproducible noise
-random.seed(42)
+from arpeggio.engine.audio import to_segment
+from arpeggio.engine.cache import WaveformCache, waveform_cache
+from arpeggio.engine.note import Chord, Note
 
 
 class Instrument(ABC):
-    """An instrument converts notes and chords to playable audio segments."""
+    """
+    An instrument converts notes and chords to playable audio segments.
+
+    Subclasses synthesize whole notes, or every note of a chord at once. Synthesized
+    notes and chords are stored in a waveform cache, so repeated sounds are only
+    synthesized once.
+    """
 
-    gen: type[SignalGenerator]
+    cacheable = True
+    """Whether the instrument produces the same waveform every time it's played."""
 
-    def __init__(self, sample_rate: int):
+    def __init__(
+        self,
+        sample_rate: int,
+        cache: WaveformCache | None = waveform_cache,
+        seed: int = 0,
+    ):
         self.sample_rate = sample_rate
         self.bit_depth = 16
+        self.cache = cache if self.cacheable else None
+        self.seed = seed
+        """Seeds instruments with randomness, along with the position of each note."""
 
     def __call__(
         self, playable: Note | Chord | None, duration: float, volume: float = 0.0
     ) -> AudioSegment:
+        n_samples = int(self.sample_rate * (duration / 1000.0))
+        samples = self.synthesize(playable, n_samples, volume=volume)
+        return to_segment(samples, self.sample_rate)
+
+    def synthesize(
+        self,
+        playable: Note | Chord | None,
+        n_samples: int,
+        volume: float = 0.0,
+        position: int = 0,
+    ) -> np.ndarray:
+        """
+        Return a fixed number of 16-bit mono samples for a note, chord, or rest.
+
+        Instruments with randomness are seeded by their seed and the note's
+        `position`, so the same note always sounds the same no matter when or where
+        it's synthesized. Returned samples may be shared with the waveform cache and
+        are read-only.
+        """
         if playable is None:
-            return self._play_rest(duration)
+            return self._play_rest(n_samples)
+        if self.cache is None:
+            return self._synthesize(
+                playable, n_samples, volume=volume, position=position
+            )
+
+        frequency = tuple(playable) if isinstance(playable, Chord) else playable
+        key = (self._kind, frequency, n_samples, volume, self.sample_rate)
+        return self.cache.get(
+            key, lambda: self._synthesize(playable, n_samples, volume=volume)
+        )
+
+    @property
+    def _kind(self) -> object:
+        """Identifies instruments that sound the same in the waveform cache."""
+        return type(self)
+
+    def _synthesize(
+        self,
+        playable: Note | Chord,
+        n_samples: int,
+        volume: float = 0.0,
+        position: int = 0,
+    ) -> np.ndarray:
         if isinstance(playable, float):
-            return self._play_note(playable, duration, volume=volume)
+            return self._play_note(
+                playable, n_samples, volume=volume, position=position
+            )
         if isinstance(playable, Chord):
-            return self._play_chord(playable, duration, volume=volume)
+            return self._play_chord(
+                playable, n_samples, volume=volume, position=position
+            )
 
         raise TypeError(f"Invalid playable type: {type(playable)}")
 
+    @abstractmethod
     def _play_note(
-        self, note: Note, duration: float, volume: float = 0.0
-    ) -> AudioSegment:
-        return self.gen(
-            note, sample_rate=self.sample_rate, bit_depth=self.bit_depth
-        ).to_audio_segment(duration, volume=volume)
+        self, note: Note, n_samples: int, volume: float = 0.0, position: int = 0
+    ) -> np.ndarray:
+        """Return `n_samples` of 16-bit samples for a note at a volume."""
 
+    @abstractmethod
     def _play_chord(
-        self, chord: Chord, duration: float, volume: float = 0.0
-    ) -> AudioSegment:
-        segments = [self._play_note(note, duration, volume=volume) for note in chord]
-        return normalized_overlay(segments)
+        self, chord: Chord, n_samples: int, volume: float = 0.0, position: int = 0
+    ) -> np.ndarray:
+        """Return `n_samples` of 16-bit samples for every note of a chord at once."""
+
+    def _quantize(self, wave: np.ndarray, volume: float = 0.0) -> np.ndarray:
+        """
+        Scale a waveform between -1 and 1 to 16-bit samples at a volume.
+
+        The waveform is scaled in place, so it shouldn't be used afterwards.
+        """
+        _, max_val = get_min_max_value(self.bit_depth)
+        wave *= max_val
+        wave *= db_to_float(volume)
+        # Casting truncates towards zero, matching pydub's generators
+        return wave.astype(np.int16)
+
+    def _play_rest(self, n_samples: int) -> np.ndarray:
+        return np.zeros(n_samples, dtype=np.int16)
+
+
+class Oscillator(Instrument):
+    """
+    A tonal instrument, synthesized from a periodic waveform.
+
+    Subclasses implement an oscillator that returns a whole note's waveform as a
+    single array operation, or every note of a chord at once.
+    """
+
+    @abstractmethod
+    def _oscillate(self, frequency: float | np.ndarray, n_samples: int) -> np.ndarray:
+        """
+        Return `n_samples` of a waveform between -1 and 1 at a frequency.
+
+        Given a column of frequencies, return one row of samples per frequency.
+        """
+
+    def _play_note(
+        self, note: Note, n_samples: int, volume: float = 0.0, position: int = 0
+    ) -> np.ndarray:
+        return self._quantize(self._oscillate(note, n_samples), volume=volume)
+
+    def _play_chord(
+        self, chord: Chord, n_samples: int, volume: float = 0.0, position: int = 0
+    ) -> np.ndarray:
+        """
+        Synthesize every note of a chord at once, as rows of one waveform matrix.
+
+        The notes are summed and scaled by one over the number of notes, so chords
+        never clip and are as loud as the average of their notes, rather than being
+        normalized chord by chord.
+        """
+        frequencies = np.array(chord, dtype=np.float64)[:, np.newaxis]
+        waves = self._oscillate(frequencies, n_samples)
+        wave = waves.sum(axis=0)
+        wave *= 1 / len(chord)
+        return self._quantize(wave, volume=volume)
+
+
+class Sine(Oscillator):
+    def _oscillate(self, frequency: float | np.ndarray, n_samples: int) -> np.ndarray:
+        sine_of = (frequency * 2 * np.pi) / self.sample_rate
+        wave = sine_of * np.arange(n_samples)
+        return np.sin(wave, out=wave)
 
-    def _play_rest(self, duration: float) -> AudioSegment:
-        return AudioSegment.silent(duration)
 
+class Square(Oscillator):
+    duty_cycle = 0.5
 
-class Sine(Instrument):
-    gen = SineGenerator
+    def _oscillate(self, frequency: float | np.ndarray, n_samples: int) -> np.ndarray:
+        cycle_length = self.sample_rate / np.asarray(frequency, dtype=np.float64)
+        pulse_length = cycle_length * self.duty_cycle
 
+        cycle_position = np.arange(n_samples) % cycle_length
+        return np.where(cycle_position < pulse_length, 1.0, -1.0)
 
-class Square(Instrument):
-    gen = SquareGenerator
 
+class Sawtooth(Oscillator):
+    duty_cycle = 1.0
 
-class Sawtooth(Instrument):
-    gen = SawtoothGenerator
+    def _oscillate(self, frequency: float | np.ndarray, n_samples: int) -> np.ndarray:
+        cycle_length = self.sample_rate / np.asarray(frequency, dtype=np.float64)
+        midpoint = cycle_length * self.duty_cycle
+        ascend_length = midpoint
+        descend_length = cycle_length - ascend_length
 
+        cycle_position = np.arange(n_samples) % cycle_length
+        ascending = cycle_position < midpoint
 
-class Triangle(Instrument):
-    gen = TriangleGenerator
+        # The descent has zero length when the duty cycle is 1, but it's never
+        # selected then, so ignore the division by zero
+        with np.errstate(divide="ignore", invalid="ignore"):
+            descending = 1.0 - (2 * (cycle_position - midpoint) / descend_length)
+        return np.where(ascending, 2 * cycle_position / ascend_length - 1.0, descending)
+
+
+class Triangle(Sawtooth):
+    duty_cycle = 0.5
 
 
 class Noise(Instrument):
-    gen = WhiteNoiseGenerator
+    # Every note position sounds different, so there's nothing to reuse
+    cacheable = False
 
     def _play_note(
-        self, note: Note, duration: float, volume: float = 0.0
-    ) -> AudioSegment:
-        # WhiteNoiseGenerator doesn't support frequency
-        return self.gen(
-            sample_rate=self.sample_rate, bit_depth=self.bit_depth
-        ).to_audio_segment(duration, volume=volume)
+        self, note: Note, n_samples: int, volume: float = 0.0, position: int = 0
+    ) -> np.ndarray:
+        # Each note position has its own generator, so noise never depends on what
+        # was synthesized before it or on which thread
+        rng = np.random.default_rng([self.seed, position])
+        return self._quantize(rng.random(n_samples) * 2 - 1.0, volume=volume)
+
+    def _play_chord(
+        self, chord: Chord, n_samples: int, volume: float = 0.0, position: int = 0
+    ) -> np.ndarray:
+        # Noise doesn't have a pitch, so chords sound like single notes
+        return self._play_note(chord[0], n_samples, volume=volume, position=position)
+
+
+class Wavetable(Oscillator):
+    """
+    A cheap approximation of another instrument, for previews.
+
+    One cycle of the instrument's waveform is computed once. Notes are synthesized
+    by reading it with a fixed-point phase accumulator, which only needs integer
+    arithmetic and a lookup per sample.
+    """
+
+    size = 1024
+    """The number of samples in the table. Must be a power of 2."""
+
+    precision = 16
+    """The number of fractional bits in the phase accumulator."""
+
+    def __init__(
+        self,
+        source: type[Oscillator],
+        sample_rate: int,
+        cache: WaveformCache | None = waveform_cache,
+        seed: int = 0,
+    ):
+        super().__init__(sample_rate, cache=cache, seed=seed)
+        self.source = source
+        # One cycle of a 1 Hz wave sampled `size` times per second
+        self.table = source(sample_rate=self.size, cache=None)._oscillate(
+            1.0, self.size
+        )
+
+    @property
+    def _kind(self) -> object:
+        return (type(self), self.source)
+
+    def _oscillate(self, frequency: float | np.ndarray, n_samples: int) -> np.ndarray:
+        step = np.rint(
+            np.asarray(frequency) * self.size / self.sample_rate * 2**self.precision
+        ).astype(np.int64)
+        phase = np.arange(n_samples, dtype=np.int64) * step
+        phase >>= self.precision
+        phase &= self.size - 1
+        return self.table.take(phase)
+
+
+def preview_instrument(
+    instrument_type: type[Instrument], sample_rate: int, seed: int = 0
+) -> Instrument:
+    """Return a cheap version of an instrument, for previews."""
+    if not issubclass(instrument_type, Oscillator):
+        # Instruments without a periodic waveform can't be captured in a table
+        return instrument_type(sample_rate=sample_rate, seed=seed)
+    return Wavetable(instrument_type, sample_rate=sample_rate, seed=seed)
 
 
 instruments = {
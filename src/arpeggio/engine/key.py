@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import numpy as np
+
 from arpeggio.engine.note import Chord, Note, get_note
 
 
@@ -23,6 +25,9 @@ class Key:
         self.tonic = tonic
         self.mode = mode
 
+    def __repr__(self) -> str:
+        return f"Key({float(self.tonic)!r}, {self.mode!r})"
+
     @property
     def scale(self, octave: int = 0) -> tuple[Note, ...]:
         return tuple([self.note(i, octave) for i in range(1, 9)])
@@ -39,6 +44,24 @@ class Key:
 
         return self.tonic + self.mode.semitones_to(wrapped_interval, wrapped_octave)
 
+    def frequencies(self, intervals: np.ndarray, octaves: np.ndarray) -> np.ndarray:
+        """Return the frequencies of notes at arrays of intervals and octaves."""
+        intervals = np.asarray(intervals)
+        # Semitones from the tonic to each interval within an octave
+        semitones = np.cumsum([0, *self.mode[:-1]])
+
+        # Wrap the intervals by an octave if necessary
+        wrapped_interval = (intervals - 1) % len(self.mode)
+        wrapped_octave = octaves + (intervals - 1) // len(self.mode)
+
+        steps = semitones[wrapped_interval] + 12 * wrapped_octave
+
+        # Songs use few distinct pitches, so calculate each one the same way as
+        # `Note.__add__` to get exactly the same frequencies as single notes.
+        unique_steps, inverse = np.unique(steps, return_inverse=True)
+        unique_notes = np.array([self.tonic + int(s) for s in unique_steps])
+        return unique_notes[inverse].reshape(steps.shape)
+
     def chord(self, interval: int, octave: int = 0) -> Chord:
         """Return the triad at a given interval and octave offset from the tonic."""
         return Chord(
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import math
 from fractions import Fraction
 
 
@@ -15,6 +16,25 @@ class Duration:
         """Return the number of milliseconds this note duration lasts."""
         return float((60_000 * float(self._fraction) / bpm) * beats_per_measure)
 
+    def to_samples(self, bpm: int, sample_rate: int, beats_per_measure: int = 4) -> int:
+        """
+        Return the number of whole samples this note duration spans.
+
+        The calculation is exact, so the sample offset of a position on a timeline
+        can be found by converting the total duration since the start.
+        """
+        samples = self._fraction * beats_per_measure * 60 * sample_rate / bpm
+        return math.floor(samples)
+
+    def to_ticks(self, ticks_per_whole: int) -> int:
+        """Return the number of ticks this note duration lasts."""
+        ticks = self._fraction * ticks_per_whole
+        if ticks.denominator != 1:
+            raise ValueError(
+                f"Duration {self._fraction} is not a whole number of ticks."
+            )
+        return int(ticks)
+
     def __truediv__(self, other: int) -> Duration:
         result = self._fraction / other
         return Duration(result.numerator, result.denominator)
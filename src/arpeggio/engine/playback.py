@@ -0,0 +1,301 @@
+"""Stream rendered audio to playback devices as it is synthesized."""
+
+from __future__ import annotations
+
+import contextlib
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import BinaryIO
+
+import numpy as np
+
+
+class AudioSink(ABC):
+    """A destination for blocks of interleaved 16-bit samples."""
+
+    sample_rate: int
+    channels: int
+
+    def open(self, sample_rate: int, channels: int) -> None:
+        """Prepare the sink to receive audio in the given format."""
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+    @abstractmethod
+    def write(self, block: np.ndarray) -> None:
+        """
+        Write a block of samples.
+
+        Real-time sinks should return once they're ready to accept the next block.
+        """
+
+    def close(self) -> None:  # noqa: B027
+        """Finish playing any buffered audio and release the sink."""
+
+
+class SounddeviceSink(AudioSink):
+    """
+    Play audio through the system's audio device using sounddevice.
+
+    Blocks are written to one continuous output stream, so playback is gapless.
+    """
+
+    def __init__(self):
+        import sounddevice
+
+        self._sounddevice = sounddevice
+        self._stream = None
+
+    def open(self, sample_rate: int, channels: int) -> None:
+        super().open(sample_rate, channels)
+        self._stream = self._sounddevice.RawOutputStream(
+            samplerate=sample_rate, channels=channels, dtype="int16"
+        )
+        self._stream.start()
+
+    def write(self, block: np.ndarray) -> None:
+        assert self._stream is not None, "The sink must be opened before writing."
+        # Blocks until the stream has room, while earlier blocks keep playing
+        self._stream.write(block.tobytes())
+
+    def close(self) -> None:
+        if self._stream is not None:
+            # Stopping waits for buffered audio to finish playing
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class PipeSink(AudioSink):
+    """
+    Write raw audio to the standard input of a command, e.g. a player or encoder.
+
+    Arguments may include `{sample_rate}` and `{channels}` placeholders, which are
+    filled in when the sink is opened.
+    """
+
+    def __init__(self, command: list[str]):
+        self.command = command
+        self._process: subprocess.Popen | None = None
+
+    def open(self, sample_rate: int, channels: int) -> None:
+        super().open(sample_rate, channels)
+        args = [
+            arg.format(sample_rate=sample_rate, channels=channels)
+            for arg in self.command
+        ]
+        self._process = subprocess.Popen(args, stdin=subprocess.PIPE)
+
+    def write(self, block: np.ndarray) -> None:
+        assert self._process is not None, "The sink must be opened before writing."
+        assert self._process.stdin is not None
+        self._process.stdin.write(block.tobytes())
+
+    def close(self) -> None:
+        if self._process is not None:
+            if self._process.stdin is not None:
+                self._process.stdin.close()
+            self._process.wait()
+
+
+class FFplaySink(PipeSink):
+    """Play audio by piping it to ffplay."""
+
+    def __init__(self):
+        super().__init__(
+            [
+                "ffplay",
+                "-nodisp",
+                "-autoexit",
+                "-loglevel",
+                "quiet",
+                "-f",
+                "s16le",
+                "-ar",
+                "{sample_rate}",
+                "-ac",
+                "{channels}",
+                "-",
+            ]
+        )
+
+
+class FileSink(AudioSink):
+    """
+    Write audio to a WAV file.
+
+    With `realtime`, each write waits for the duration of its block, imitating a
+    playback device. This is useful for testing playback without audio hardware.
+    """
+
+    def __init__(self, file: str | BinaryIO, realtime: bool = False):
+        self.file = file
+        self.realtime = realtime
+        self._wav: wave.Wave_write | None = None
+        self._deadline = 0.0
+
+    def open(self, sample_rate: int, channels: int) -> None:
+        super().open(sample_rate, channels)
+        self._wav = wave.open(self.file, "wb")  # noqa: SIM115
+        self._wav.setnchannels(channels)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(sample_rate)
+        self._deadline = time.perf_counter()
+
+    def write(self, block: np.ndarray) -> None:
+        assert self._wav is not None, "The sink must be opened before writing."
+        self._wav.writeframes(block.tobytes())
+
+        if self.realtime:
+            self._deadline += len(block) / self.channels / self.sample_rate
+            time.sleep(max(self._deadline - time.perf_counter(), 0.0))
+
+    def close(self) -> None:
+        if self._wav is not None:
+            self._wav.close()
+
+
+def default_sink() -> AudioSink:
+    """Return a sink for the first available audio playback backend."""
+    # sounddevice raises OSError if the PortAudio library is missing
+    try:
+        return SounddeviceSink()
+    except (ImportError, OSError):
+        pass
+
+    if shutil.which("ffplay"):
+        return FFplaySink()
+
+    raise RuntimeError(
+        "No audio playback backend found. Install sounddevice or ffmpeg."
+    )
+
+
+@dataclass
+class PlaybackStats:
+    """Statistics from a streamed playback."""
+
+    latency: float = 0.0
+    """Seconds from starting playback until the first block was written."""
+
+    blocks: int = 0
+    """The number of blocks played."""
+
+    underruns: int = 0
+    """The number of times synthesis fell behind playback."""
+
+
+_DONE = object()
+
+
+class StreamPlayer:
+    """
+    Play blocks of audio while they are still being synthesized.
+
+    Blocks are rendered ahead on a background thread into a bounded buffer.
+    Playback starts once `prebuffer` blocks are ready, and an underrun is counted
+    whenever the sink needs a block before synthesis has produced it. `on_start` is
+    called just before the first block is written to the sink.
+    """
+
+    def __init__(
+        self,
+        sink: AudioSink,
+        *,
+        prebuffer: int = 2,
+        buffer_size: int = 8,
+        on_start: Callable[[], None] | None = None,
+    ):
+        self.sink = sink
+        self.prebuffer = prebuffer
+        self.buffer_size = max(buffer_size, prebuffer)
+        self.on_start = on_start
+        self._stopped = threading.Event()
+
+    def stop(self) -> None:
+        """Stop playback and synthesis as soon as possible."""
+        self._stopped.set()
+
+    def play(
+        self, blocks: Iterable[np.ndarray], *, sample_rate: int, channels: int = 2
+    ) -> PlaybackStats:
+        """Play blocks of interleaved 16-bit samples, returning when finished."""
+        self._stopped.clear()
+        stats = PlaybackStats()
+        buffer: queue.Queue = queue.Queue(maxsize=self.buffer_size)
+        started = time.perf_counter()
+
+        producer = threading.Thread(
+            target=self._render_ahead, args=(blocks, buffer), daemon=True
+        )
+        producer.start()
+
+        # Wait for the prebuffer to fill before starting the sink
+        while (
+            buffer.qsize() < self.prebuffer
+            and producer.is_alive()
+            and not self._stopped.is_set()
+        ):
+            time.sleep(0.001)
+
+        self.sink.open(sample_rate, channels)
+        try:
+            while not self._stopped.is_set():
+                try:
+                    block = buffer.get_nowait()
+                    starved = False
+                except queue.Empty:
+                    block = self._wait_for_block(buffer)
+                    starved = True
+
+                if block is _DONE:
+                    break
+                if isinstance(block, BaseException):
+                    raise block
+
+                if not stats.blocks:
+                    stats.latency = time.perf_counter() - started
+                    if self.on_start is not None:
+                        self.on_start()
+                elif starved:
+                    stats.underruns += 1
+                self.sink.write(block)
+                stats.blocks += 1
+        finally:
+            self._stopped.set()
+            self.sink.close()
+            # Unblock the producer if it's waiting for space in the buffer
+            while producer.is_alive():
+                with contextlib.suppress(queue.Empty):
+                    buffer.get(timeout=0.01)
+
+        return stats
+
+    def _wait_for_block(self, buffer: queue.Queue) -> object:
+        """Wait for the next block, or until playback is stopped."""
+        while not self._stopped.is_set():
+            with contextlib.suppress(queue.Empty):
+                return buffer.get(timeout=0.01)
+        return _DONE
+
+    def _render_ahead(self, blocks: Iterable[np.ndarray], buffer: queue.Queue):
+        iterator = iter(blocks)
+        try:
+            for block in iterator:
+                if self._stopped.is_set():
+                    return
+                buffer.put(block)
+            buffer.put(_DONE)
+        except Exception as e:
+            buffer.put(e)
+        finally:
+            # Release resources held by generators that were stopped early
+            if hasattr(iterator, "close"):
+                iterator.close()
@@ -2,16 +2,45 @@
 
 from __future__ import annotations
 
-from pydantic import Field, PositiveInt, field_validator
+import contextvars
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import AbstractContextManager, nullcontext
+from functools import partial
+from typing import BinaryIO, Literal, TypeVar
+
+import numpy as np
+from pydantic import Field, PositiveInt, PrivateAttr, field_validator
 from pydantic_core import PydanticCustomError
 from pydub import AudioSegment
-from pydub.playback import play
 
-from arpeggio.engine.audio import normalized_overlay
+from arpeggio import profiling
+from arpeggio.engine.audio import (
+    MixBus,
+    normalize,
+    peak_of,
+    resample,
+    to_segment,
+    write_pcm,
+    write_wav,
+)
+from arpeggio.engine.cache import TrackCache
 from arpeggio.engine.key import Key
+from arpeggio.engine.playback import (
+    AudioSink,
+    PlaybackStats,
+    StreamPlayer,
+    default_sink,
+)
+from arpeggio.engine.timeline import CHUNK_SIZE, process_pool
 from arpeggio.engine.track import Track
 from arpeggio.validation import ValidatedConfig
 
+T = TypeVar("T")
+
+PREVIEW_SAMPLE_RATE = 8_000
+"""The highest sample rate that songs are synthesized at in preview mode."""
+
 
 class Song(ValidatedConfig):
     """The base component of a parsed program."""
@@ -31,6 +60,9 @@ class Song(ValidatedConfig):
     loop: PositiveInt = 1
     """The number of times to loop the song."""
 
+    _preview: bool = PrivateAttr(False)
+    _playback_rate: int | None = PrivateAttr(None)
+
     @field_validator("key", mode="before")
     def validate_key(cls, v: str):
         try:
@@ -46,17 +78,333 @@ class Song(ValidatedConfig):
         """Length of the song in milliseconds."""
         return max([len(track) for track in self.tracks])
 
-    def render(self) -> AudioSegment:
+    @property
+    def preview(self) -> bool:
+        """If true, the song is rendered in mono, for quick low-fidelity previews."""
+        return self._preview
+
+    @preview.setter
+    def preview(self, value: bool) -> None:
+        self._preview = value
+
+    @property
+    def channels(self) -> int:
+        """The number of interleaved channels in rendered audio."""
+        return 1 if self.preview else 2
+
+    @property
+    def playback_rate(self) -> int:
+        """
+        The sample rate that the song is played at.
+
+        This defaults to the sample rate, and audio is resampled when they differ.
+        """
+        return self._playback_rate or self.sample_rate
+
+    @playback_rate.setter
+    def playback_rate(self, value: int | None) -> None:
+        self._playback_rate = value
+
+    @property
+    def audible_tracks(self) -> list[Track]:
+        """The tracks that are heard when the song is rendered."""
         unmuted_tracks = [track for track in self.tracks if not track.mute]
         solo_tracks = [track for track in self.tracks if track.solo]
-        tracks = solo_tracks or unmuted_tracks
+        return solo_tracks or unmuted_tracks
+
+    def render(self, workers: int = 1, cache: TrackCache | None = None) -> AudioSegment:
+        """
+        Render the song to an audio segment.
+
+        With more than one worker, tracks are synthesized concurrently in a thread
+        pool. Workers left over once every track has one also split long tracks of
+        instruments like noise into chunks, synthesized in a pool of processes.
+        Tracks are always mixed in order, so the output is identical to rendering
+        serially.
+
+        With a track cache, only tracks that aren't already cached are synthesized.
+        """
+        tracks = self.audible_tracks
+        n_samples = max([track.n_samples for track in tracks], default=0)
+        bus = MixBus(self.channels * n_samples)
 
-        rendered = normalized_overlay([track.render() for track in tracks])
+        # Each track is added to the bus as soon as it's rendered, so only the bus
+        # and the tracks still being rendered are held in memory. Looped tracks are
+        # rendered once and mixed repeatedly
+        with _executor(workers) as executor:
+            _load_cached(tracks, cache, executor=executor, workers=workers)
+            render = _loop_renderer(tracks, workers)
+            rendered = _imap_tracks(render, tracks, executor=executor)
+            for track, samples in zip(tracks, rendered, strict=True):
+                with profiling.span(track.label, "mix"):
+                    track.mix_into(bus, samples, channels=self.channels)
+
+        with profiling.span("normalize"):
+            samples = bus.normalize()
         if self.loop > 1:
-            rendered *= self.loop
+            samples = np.tile(samples, self.loop)
+
+        return to_segment(samples, self.sample_rate, channels=self.channels)
+
+    def iter_blocks(
+        self,
+        block_size: int = 2**16,
+        workers: int = 1,
+        prescan: bool = True,
+        cache: TrackCache | None = None,
+        progress: Callable[[int, int], None] | None = None,
+    ) -> Iterator[np.ndarray]:
+        """
+        Render the song as blocks of interleaved 16-bit samples.
+
+        Each block contains up to `block_size` frames, and only one block per track
+        is held in memory at a time. To normalize the mix consistently, tracks are
+        synthesized in two passes: one to find the peaks of the mix and one to
+        output it.
+
+        Without `prescan`, each block is instead normalized by the peaks of the mix
+        so far. The first block is available immediately, but loudness may drop
+        partway through a song that would clip.
+
+        With a track cache, tracks that aren't already cached are rendered in full
+        before the first block, and cached tracks are read without synthesis.
+
+        `progress` is called after each block is mixed, with the number of frames
+        mixed so far and in total, counting both passes. It's also called after each
+        track is rendered into the cache. Exceptions raised by it stop rendering.
+        """
+        tracks = self.audible_tracks
+        n_samples = max([track.n_samples for track in tracks], default=0)
+        total = n_samples * (self.loop + prescan)
+        done = 0
+
+        def mix_blocks(executor: Executor | None) -> Iterator[np.ndarray]:
+            nonlocal done
+            for block in _mix_blocks(
+                tracks, n_samples, block_size, executor, channels=self.channels
+            ):
+                if progress is not None:
+                    done += len(block) // self.channels
+                    progress(done, total)
+                yield block
+
+        with _executor(workers) as executor:
+            _load_cached(
+                tracks,
+                cache,
+                executor=executor,
+                workers=workers,
+                progress=partial(progress, 0, total) if progress else None,
+            )
+
+            if not prescan:
+                peak = 0.0
+                for _ in range(self.loop):
+                    for block in mix_blocks(executor=executor):
+                        peak = max(peak, peak_of(block))
+                        yield normalize(block, peak=peak, out=block)
+                return
+
+            peak = max(
+                [peak_of(block) for block in mix_blocks(executor=executor)],
+                default=0.0,
+            )
+
+            for _ in range(self.loop):
+                for block in mix_blocks(executor=executor):
+                    yield normalize(block, peak=peak, out=block)
+
+    def export(
+        self,
+        file: str | BinaryIO,
+        block_size: int = 2**16,
+        workers: int = 1,
+        cache: TrackCache | None = None,
+        format: Literal["wav", "raw"] = "wav",
+        progress: Callable[[int, int], None] | None = None,
+    ) -> None:
+        """
+        Render the song to a file, writing one block at a time.
+
+        Files are written as WAV, or as `raw` interleaved 16-bit PCM with no header.
+        Writing never seeks, so `file` can be a pipe like stdout. `progress` is
+        called as blocks are rendered, like in `iter_blocks`.
+        """
+        blocks = self.iter_blocks(
+            block_size=block_size, workers=workers, cache=cache, progress=progress
+        )
+        with profiling.span("export"):
+            if format == "raw":
+                write_pcm(file, blocks)
+                return
+
+            n_samples = max(
+                [track.n_samples for track in self.audible_tracks], default=0
+            )
+            write_wav(
+                file,
+                blocks,
+                n_frames=n_samples * self.loop,
+                sample_rate=self.sample_rate,
+                channels=self.channels,
+            )
+
+    def play(
+        self,
+        workers: int = 1,
+        sink: AudioSink | None = None,
+        block_size: int = 2**12,
+        player: StreamPlayer | None = None,
+        cache: TrackCache | None = None,
+        progress: Callable[[int, int], None] | None = None,
+    ) -> PlaybackStats:
+        """
+        Play the song, starting as soon as the first blocks are synthesized.
+
+        The rest of the song is rendered ahead while it plays. Audio is played
+        through the default audio device unless another sink is given, and is
+        resampled if the playback rate differs from the sample rate. `progress` is
+        called as blocks are rendered, like in `iter_blocks`.
+        """
+        player = player or StreamPlayer(sink or default_sink())
+        blocks = self.iter_blocks(
+            block_size=block_size,
+            workers=workers,
+            prescan=False,
+            cache=cache,
+            progress=progress,
+        )
+        if self.playback_rate != self.sample_rate:
+            blocks = resample(
+                blocks,
+                from_rate=self.sample_rate,
+                to_rate=self.playback_rate,
+                channels=self.channels,
+            )
+
+        with profiling.span("play"):
+            return player.play(
+                blocks, sample_rate=self.playback_rate, channels=self.channels
+            )
+
+
+def _executor(workers: int) -> AbstractContextManager[Executor | None]:
+    """Return a thread pool for multiple workers, or a null context for one."""
+    if workers > 1:
+        return ThreadPoolExecutor(max_workers=workers)
+    return nullcontext()
+
+
+def _loop_renderer(
+    tracks: list[Track], workers: int, progress: Callable[[], None] | None = None
+) -> Callable[[Track], np.ndarray]:
+    """
+    Return a function that renders the loops of some tracks with a number of workers.
+
+    With more workers than tracks, loops of instruments that never reuse a waveform
+    are split into chunks that are synthesized in a process pool, once they're long
+    enough to fill it. Other instruments synthesize each distinct sound once, so
+    they're cheaper to render in one piece. `progress` is passed on to
+    `Track.render_loop`.
+    """
+    if workers <= len(tracks):
+        return partial(Track.render_loop, progress=progress)
+
+    def render(track: Track) -> np.ndarray:
+        loop_samples = (track.n_samples - track.offset_samples) // track.loop
+        executor = None
+        if not track.instrument.cacheable and loop_samples >= CHUNK_SIZE * workers:
+            executor = process_pool(workers)
+        return track.render_loop(executor=executor, progress=progress)
+
+    return render
+
+
+def _imap_tracks(
+    render: Callable[[Track], T], tracks: list[Track], executor: Executor | None
+) -> Iterator[T]:
+    """Apply a render function to each track, yielding results in track order."""
+
+    def run(track: Track) -> T:
+        with profiling.span(track.label, "synthesize"):
+            return render(track)
+
+    if executor is None or len(tracks) <= 1:
+        yield from (run(track) for track in tracks)
+        return
+
+    # Workers run in a copy of this context so that they report to the same profiler
+    futures = [
+        executor.submit(contextvars.copy_context().run, run, track) for track in tracks
+    ]
+    try:
+        for future in futures:
+            yield future.result()
+    finally:
+        # Don't start tracks that are no longer needed if rendering stops early
+        for future in futures:
+            future.cancel()
+
+
+def _load_cached(
+    tracks: list[Track],
+    cache: TrackCache | None,
+    executor: Executor | None,
+    workers: int = 1,
+    progress: Callable[[], None] | None = None,
+) -> None:
+    """
+    Load tracks from a cache, rendering and caching any that are missing.
+
+    Tracks are cached as soon as they're rendered, so a render that's stopped early
+    keeps the tracks it finished. `progress` is called while synthesizing each track
+    and after caching it, so that it can stop a render partway through a track.
+    """
+    if cache is None:
+        return
+
+    missing, fingerprints = [], []
+    for track in tracks:
+        if (fingerprint := track.fingerprint) is None:
+            continue
+        if (samples := cache.get(fingerprint)) is not None:
+            track.use_rendered(samples)
+        else:
+            missing.append(track)
+            fingerprints.append(fingerprint)
+
+    render = _loop_renderer(missing, workers, progress=progress)
+    rendered = _imap_tracks(render, missing, executor=executor)
+    for track, fingerprint, samples in zip(
+        missing, fingerprints, rendered, strict=True
+    ):
+        cache.put(fingerprint, samples)
+        track.use_rendered(samples)
+        if progress is not None:
+            progress()
+
 
-        return rendered
+def _mix_blocks(
+    tracks: list[Track],
+    n_samples: int,
+    block_size: int,
+    executor: Executor | None,
+    channels: int = 2,
+) -> Iterator[np.ndarray]:
+    """Yield blocks of the summed tracks, without normalization."""
+    gains = [track.channel_gains(channels) for track in tracks]
+    for start in range(0, n_samples, block_size):
+        stop = min(start + block_size, n_samples)
+        bus = MixBus(channels * (stop - start))
+        track_blocks = _imap_tracks(
+            partial(Track.render_block, start=start, stop=stop),
+            tracks,
+            executor=executor,
+        )
+        for track, track_gains, track_block in zip(
+            tracks, gains, track_blocks, strict=True
+        ):
+            with profiling.span(track.label, "mix"):
+                bus.add(track_block, gains=track_gains)
 
-    def play(self):
-        """Play the song."""
-        play(self.render())
+        yield bus.samples
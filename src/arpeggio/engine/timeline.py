@@ -0,0 +1,305 @@
+"""Events placed on a timeline of samples, ready to be synthesized."""
+
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+import threading
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Protocol
+
+import numpy as np
+
+from arpeggio.engine.events import TICKS_PER_WHOLE, EventTable, ticks_to_samples
+from arpeggio.engine.note import Chord, Note
+
+
+class Synthesizer(Protocol):
+    """A function that synthesizes a note or chord for a number of samples."""
+
+    def __call__(
+        self, playable: Note | Chord, n_samples: int, *, position: int
+    ) -> np.ndarray:
+        """Synthesize a note that starts `position` ticks into the timeline."""
+
+
+Segment = tuple[EventTable, int]
+"""An event table and the number of times it repeats."""
+
+CHUNK_SIZE = 2**18
+"""The default number of samples in each chunk of a chunked render."""
+
+
+class Timeline:
+    """
+    A sequence of repeated event tables placed at sample offsets.
+
+    Event times are converted from ticks to samples with exact integer arithmetic,
+    so note boundaries never drift no matter how many notes there are. Repeated
+    tables are stored once and only synthesized once for each distinct rounding of
+    their start time, so rendering scales with the unique content of a track
+    rather than its repeat counts.
+    """
+
+    def __init__(self, segments: Sequence[Segment], *, bpm: int, sample_rate: int):
+        self.segments = list(segments)
+        self.bpm = bpm
+        self.sample_rate = sample_rate
+
+        # The segment and start tick of every repetition, and a final end tick
+        counts = [repeat for _, repeat in self.segments]
+        lengths = np.array([table.length for table, _ in self.segments], np.int64)
+        self._segment = np.repeat(np.arange(len(self.segments)), counts)
+        ticks = np.zeros(len(self._segment) + 1, dtype=np.int64)
+        np.cumsum(np.repeat(lengths, counts), out=ticks[1:])
+        self._ticks = ticks
+
+        self.offsets = ticks_to_samples(ticks, bpm=bpm, sample_rate=sample_rate)
+        """The sample offset of each repetition, followed by the timeline length."""
+
+        self._placements: dict[tuple[int, int], tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        """Length of the timeline in samples."""
+        return int(self.offsets[-1])
+
+    def render(
+        self,
+        synthesize: Synthesizer,
+        dtype=np.int16,
+        *,
+        reuse: bool = True,
+        executor: Executor | None = None,
+        chunk_size: int = CHUNK_SIZE,
+        progress: Callable[[], None] | None = None,
+    ) -> np.ndarray:
+        """
+        Synthesize every event in place and return the samples.
+
+        Unless `reuse` is false, like for instruments that never sound the same
+        twice, repetitions that sound identical are only synthesized once.
+
+        With an executor, repetitions are split into chunks of roughly `chunk_size`
+        samples at note boundaries, and the chunks are synthesized concurrently. A
+        process pool synthesizes them on multiple cores, as long as `synthesize` can
+        be pickled, like an instrument's `synthesize` method. Each chunk is copied to
+        its own span of the output, so the result is identical to rendering
+        serially.
+
+        `progress` is called after each chunk, which is split the same way even
+        without an executor. It can raise to stop rendering partway through.
+        """
+        samples = np.zeros(len(self), dtype=dtype)
+
+        # Repetitions whose start times round the same way sound identical, so
+        # only the first of each is synthesized and the rest are copied from it
+        first: dict[tuple[int, int], int] = {}
+        copies: list[tuple[int, int]] = []
+        spans: list[tuple[int, int, int]] = []
+        for i in range(len(self._segment)):
+            key = self._phase(i)
+            if reuse and key in first:
+                copies.append((i, first[key]))
+                continue
+
+            first[key] = i
+            length = int(self.offsets[i + 1] - self.offsets[i])
+            if executor is None and progress is None:
+                spans.append((i, 0, length))
+            else:
+                spans.extend(self._chunks(i, length, chunk_size))
+
+        if executor is None:
+            chunks: Iterable[np.ndarray] = (
+                self._render_repetition(i, start, stop, synthesize, dtype)
+                for i, start, stop in spans
+            )
+        else:
+            # Only the events of each chunk are sent to the executor, rather than
+            # the whole timeline
+            futures = [
+                executor.submit(
+                    _synthesize_events,
+                    synthesize,
+                    *self._events_in(i, start, stop),
+                    start,
+                    stop,
+                    dtype,
+                )
+                for i, start, stop in spans
+            ]
+            chunks = (future.result() for future in futures)
+
+        try:
+            for (i, start, stop), chunk in zip(spans, chunks, strict=True):
+                offset = int(self.offsets[i])
+                samples[offset + start : offset + stop] = chunk
+                if progress is not None:
+                    progress()
+        finally:
+            if executor is not None:
+                # Don't start chunks that are no longer needed if rendering stops
+                for future in futures:
+                    future.cancel()
+
+        for i, source in copies:
+            start, stop = int(self.offsets[i]), int(self.offsets[i + 1])
+            source_start = int(self.offsets[source])
+            samples[start:stop] = samples[source_start : source_start + stop - start]
+
+        return samples
+
+    def _chunks(
+        self, i: int, length: int, chunk_size: int
+    ) -> list[tuple[int, int, int]]:
+        """Split a repetition into spans of about `chunk_size` samples."""
+        starts, _ = self._placement(i)
+        # Cut at the first note that starts after each multiple of the chunk size,
+        # so that notes are never split between chunks
+        targets = np.searchsorted(starts, np.arange(chunk_size, length, chunk_size))
+        cuts = np.unique(starts[targets[targets < len(starts)]])
+        bounds = [0, *cuts[(cuts > 0) & (cuts < length)].tolist(), length]
+        return [(i, lo, hi) for lo, hi in itertools.pairwise(bounds) if lo < hi]
+
+    def render_block(
+        self, start: int, stop: int, synthesize: Synthesizer, dtype=np.int16
+    ) -> np.ndarray:
+        """
+        Synthesize the events that overlap a span of samples and return the span.
+
+        Events that extend past either end of the span are synthesized in full and
+        trimmed, so rendering consecutive blocks matches rendering the timeline.
+        """
+        samples = np.zeros(stop - start, dtype=dtype)
+
+        first = max(int(np.searchsorted(self.offsets, start, side="right")) - 1, 0)
+        last = min(
+            int(np.searchsorted(self.offsets, stop, side="left")), len(self._segment)
+        )
+        for i in range(first, last):
+            offset = int(self.offsets[i])
+            lo = max(start, offset)
+            hi = min(stop, int(self.offsets[i + 1]))
+            if lo < hi:
+                samples[lo - start : hi - start] = self._render_repetition(
+                    i, lo - offset, hi - offset, synthesize, dtype
+                )
+
+        return samples
+
+    def _phase(self, i: int) -> tuple[int, int]:
+        """
+        Return a key for how a repetition's events round to samples.
+
+        Two repetitions of a segment whose start ticks leave the same remainder
+        when converted to samples have identical sample placements.
+        """
+        ticks = int(self._ticks[i]) * 4 * 60 * self.sample_rate
+        return int(self._segment[i]), ticks % (self.bpm * TICKS_PER_WHOLE)
+
+    def _placement(self, i: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return the start and stop samples of a repetition's events."""
+        key = self._phase(i)
+        if key not in self._placements:
+            events, _ = self.segments[key[0]]
+            origin = self._ticks[i]
+            bpm, sample_rate = self.bpm, self.sample_rate
+            base = ticks_to_samples(origin, bpm=bpm, sample_rate=sample_rate)
+            self._placements[key] = (
+                ticks_to_samples(
+                    origin + events.start, bpm=bpm, sample_rate=sample_rate
+                )
+                - base,
+                ticks_to_samples(
+                    origin + events.start + events.duration,
+                    bpm=bpm,
+                    sample_rate=sample_rate,
+                )
+                - base,
+            )
+        return self._placements[key]
+
+    def _render_repetition(
+        self, i: int, start: int, stop: int, synthesize: Synthesizer, dtype
+    ) -> np.ndarray:
+        """Synthesize a span of samples within a single repetition."""
+        return _synthesize_events(
+            synthesize, *self._events_in(i, start, stop), start, stop, dtype
+        )
+
+    def _events_in(
+        self, i: int, start: int, stop: int
+    ) -> tuple[EventTable, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Return the events of a repetition that may overlap a span of samples.
+
+        Returns the events with their start and stop samples within the repetition,
+        and their positions in ticks from the start of the timeline.
+        """
+        events, _ = self.segments[int(self._segment[i])]
+        starts, stops = self._placement(i)
+
+        # Events are in order, so only those that start between the last event
+        # starting at or before the span and the end of the span can overlap it.
+        first = max(int(np.searchsorted(starts, start, side="right")) - 1, 0)
+        last = int(np.searchsorted(starts, stop, side="left"))
+        return (
+            events[first:last],
+            starts[first:last],
+            stops[first:last],
+            self._ticks[i] + events.start[first:last],
+        )
+
+
+def _synthesize_events(
+    synthesize: Synthesizer,
+    events: EventTable,
+    starts: np.ndarray,
+    stops: np.ndarray,
+    positions: np.ndarray,
+    start: int,
+    stop: int,
+    dtype,
+) -> np.ndarray:
+    """
+    Synthesize events into a span of samples, trimming any that extend past it.
+
+    Event starts and stops are sample offsets in the same frame as the span.
+    """
+    samples = np.zeros(stop - start, dtype=dtype)
+    for j in range(len(events)):
+        event_start, event_stop = int(starts[j]), int(stops[j])
+        if event_stop <= start:
+            continue
+
+        waveform = synthesize(
+            events.playable(j), event_stop - event_start, position=int(positions[j])
+        )
+        lo, hi = max(event_start, start), min(event_stop, stop)
+        samples[lo - start : hi - start] = waveform[lo - event_start : hi - event_start]
+
+    return samples
+
+
+_process_pool: tuple[int, ProcessPoolExecutor] | None = None
+_process_pool_lock = threading.Lock()
+
+
+def process_pool(workers: int) -> Executor:
+    """
+    Return a shared pool of processes for synthesizing chunks of timelines.
+
+    Starting processes is slow, so the pool is started on first use and reused by
+    later renders. Asking for a different number of workers replaces it. Processes
+    are spawned rather than forked, since renders may start them from threads.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool[0] != workers:
+            if _process_pool is not None:
+                _process_pool[1].shutdown(wait=False)
+            context = multiprocessing.get_context("spawn")
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _process_pool = (workers, pool)
+        return _process_pool[1]
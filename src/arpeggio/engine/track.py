@@ -2,8 +2,11 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable, Sequence
+from concurrent.futures import Executor
 from functools import cached_property
 
+import numpy as np
 from pydantic import (
     Field,
     NonNegativeInt,
@@ -14,10 +17,23 @@ from pydantic import (
 )
 from pydantic_core import PydanticCustomError
 from pydub import AudioSegment
+from pydub.utils import db_to_float
 
 from arpeggio.engine import Key
-from arpeggio.engine.instrument import Instrument, get_instrument
+from arpeggio.engine.audio import MixBus, pan_gains, to_segment
+from arpeggio.engine.events import (
+    MAX_CHORD_SIZE,
+    TICKS_PER_WHOLE,
+    EventTable,
+    ticks_to_samples,
+)
+from arpeggio.engine.instrument import (
+    Instrument,
+    get_instrument,
+    preview_instrument,
+)
 from arpeggio.engine.note import Chord, Duration, Note
+from arpeggio.engine.timeline import Segment, Timeline, process_pool
 from arpeggio.validation import ValidatedConfig
 
 
@@ -65,7 +81,13 @@ class Track(ValidatedConfig):
     bpm: PositiveInt
     """The tempo of the song in beats per minute."""
 
-    _segment: AudioSegment = PrivateAttr(default_factory=AudioSegment.empty)
+    _segments: list[Segment] = PrivateAttr(default_factory=list)
+    _timeline: Timeline | None = PrivateAttr(None)
+    _fingerprint: str | None = PrivateAttr(None)
+    _label: str = PrivateAttr("track")
+    _seed: int = PrivateAttr(0)
+    _preview: bool = PrivateAttr(False)
+    _rendered: np.ndarray | None = PrivateAttr(None)
 
     @field_validator("instrument_type", mode="before")
     def validate_instrument(cls, v: str):
@@ -78,13 +100,120 @@ class Track(ValidatedConfig):
                 dict(instrument_name=v),
             ) from None
 
+    @property
+    def fingerprint(self) -> str | None:
+        """A hash of the source that produced the track, used to cache renders."""
+        return self._fingerprint
+
+    @fingerprint.setter
+    def fingerprint(self, value: str | None) -> None:
+        self._fingerprint = value
+
+    @property
+    def label(self) -> str:
+        """A name for the track in profiles and reports."""
+        return self._label
+
+    @label.setter
+    def label(self, value: str) -> None:
+        self._label = value
+
+    @property
+    def seed(self) -> int:
+        """Seeds instruments with randomness, like noise, for reproducible output."""
+        return self._seed
+
+    @seed.setter
+    def seed(self, value: int) -> None:
+        self._seed = value
+        self.__dict__.pop("instrument", None)
+
+    @property
+    def preview(self) -> bool:
+        """If true, synthesize with cheaper, lower fidelity instruments."""
+        return self._preview
+
+    @preview.setter
+    def preview(self, value: bool) -> None:
+        self._preview = value
+        self.__dict__.pop("instrument", None)
+
     @cached_property
     def instrument(self) -> Instrument:
-        return self.instrument_type(sample_rate=self.sample_rate)
+        if self.preview:
+            return preview_instrument(
+                self.instrument_type, sample_rate=self.sample_rate, seed=self.seed
+            )
+        return self.instrument_type(sample_rate=self.sample_rate, seed=self.seed)
+
+    @property
+    def events(self) -> EventTable:
+        """The notes and chords of the track, with repeats expanded."""
+        return EventTable.concatenate(
+            [table.tile(repeat) for table, repeat in self._get_segments()]
+        )
 
     def __len__(self) -> int:
         """Length of the track in milliseconds."""
-        return len(self._segment)
+        return round(1000 * self._length / self.sample_rate)
+
+    def extend(
+        self,
+        intervals: Sequence[int] | np.ndarray,
+        durations: Sequence[int] | np.ndarray,
+        *,
+        octaves: Sequence[int] | np.ndarray | None = None,
+        rests: Sequence[bool] | np.ndarray | None = None,
+        repeat: int = 1,
+    ) -> None:
+        """
+        Add a sequence of notes or chords and rests to the end of the track.
+
+        Durations are measured in ticks. Intervals at positions where `rests` is true
+        are ignored. The sequence is stored once and played `repeat` times in a row.
+        """
+        intervals = np.asarray(intervals, dtype=np.int64)
+        durations = np.asarray(durations, dtype=np.int64)
+        octaves = (
+            np.zeros_like(intervals)
+            if octaves is None
+            else np.asarray(octaves, dtype=np.int64)
+        )
+        rests = (
+            np.zeros(len(intervals), dtype=bool)
+            if rests is None
+            else np.asarray(rests, dtype=bool)
+        )
+
+        starts = np.cumsum(durations) - durations
+        notes = ~rests
+        note_intervals = intervals[notes]
+        note_octaves = octaves[notes] + self.octave
+        n_notes = len(note_intervals)
+
+        frequency = np.full((n_notes, MAX_CHORD_SIZE), np.nan)
+        if self.chords:
+            # Triads stack the root, third, and fifth
+            for i, step in enumerate((0, 2, 4)):
+                frequency[:, i] = self.key.frequencies(
+                    note_intervals + step, note_octaves
+                )
+        else:
+            frequency[:, 0] = self.key.frequencies(note_intervals, note_octaves)
+
+        note_durations = durations[notes]
+        if self.staccato:
+            note_durations = note_durations // 2
+
+        events = EventTable(
+            start=starts[notes],
+            duration=note_durations,
+            frequency=frequency,
+            chord_size=np.full(n_notes, 3 if self.chords else 1, dtype=np.int8),
+            length=int(durations.sum()),
+        )
+        self._segments.append((events, repeat))
+        self._timeline = None
 
     def play(
         self,
@@ -94,44 +223,174 @@ class Track(ValidatedConfig):
         octave: int = 0,
     ) -> Note | Chord:
         """Add a note or chord to the track's timeline."""
-        playable: Note | Chord
-        if self.chords:
-            playable = self.key.chord(interval, octave + self.octave)
-        else:
-            playable = self.key.note(interval, octave + self.octave)
+        self.extend([interval], [duration.to_ticks(TICKS_PER_WHOLE)], octaves=[octave])
 
-        if self.staccato:
-            self._add_to_timeline(playable, duration=duration / 2)
-            self.rest(duration=duration / 2)
-        else:
-            self._add_to_timeline(playable, duration=duration)
-
-        return playable
+        if self.chords:
+            return self.key.chord(interval, octave + self.octave)
+        return self.key.note(interval, octave + self.octave)
 
     def rest(self, *, duration: Duration) -> None:
         """Add a rest to the track's timeline."""
-        self._add_to_timeline(None, duration=duration)
+        self.extend([0], [duration.to_ticks(TICKS_PER_WHOLE)], rests=[True])
 
-    def _add_to_timeline(
-        self, playable: Note | Chord | None, *, duration: Duration
-    ) -> None:
-        duration_ms = duration.to_millis(self.bpm)
-        # Concatenating segments like this compounds rounding errors in note length,
-        # but it's 10x faster than the alternative of calculating and overlaying notes
-        # at correct positions. The total accumulated error with 32nd notes over 4
-        # minutes is only ~100ms, so I think it's worth the speed.
-        self._segment += self.instrument(
-            playable, duration=duration_ms, volume=self.volume
-        ).pan(self.pan)
-
-    def render(self) -> AudioSegment:
-        """Render the track to an audio segment."""
-        segment = self._segment * self.loop if self.loop > 1 else self._segment
+    @property
+    def n_samples(self) -> int:
+        """Length of the rendered track in samples, including offset and loops."""
+        return self.offset_samples + self._length * self.loop
+
+    @property
+    def _length(self) -> int:
+        """Length of one loop of the track in samples."""
+        ticks = sum(table.length * repeat for table, repeat in self._segments)
+        return int(ticks_to_samples(ticks, bpm=self.bpm, sample_rate=self.sample_rate))
+
+    @property
+    def offset_samples(self) -> int:
+        """Length of the silence before the track starts, in samples."""
+        return Duration(self.offset, 16).to_samples(self.bpm, self.sample_rate)
+
+    def _get_segments(self) -> list[Segment]:
+        """Return the track's segments, joining consecutive unrepeated ones."""
+        segments: list[Segment] = []
+        run: list[EventTable] = []
+        for table, repeat in self._segments:
+            if repeat == 1:
+                run.append(table)
+                continue
+
+            if run:
+                segments.append((EventTable.concatenate(run), 1))
+                run = []
+            segments.append((table, repeat))
+        if run:
+            segments.append((EventTable.concatenate(run), 1))
+
+        self._segments = segments
+        return segments
+
+    def _get_timeline(self) -> Timeline:
+        if self._timeline is None:
+            self._timeline = Timeline(
+                self._get_segments(), bpm=self.bpm, sample_rate=self.sample_rate
+            )
+        return self._timeline
+
+    def channel_gains(self, channels: int) -> np.ndarray:
+        """
+        Return the gain of each channel when mixing into mono or stereo.
+
+        Volume and pan are applied once, when the track is mixed, so notes are
+        synthesized and cached at full scale regardless of either.
+        """
+        gain = np.float32(db_to_float(self.volume))
+        if channels == 1:
+            return np.array([gain])
+        return gain * pan_gains(self.pan)
+
+    def render(self, workers: int = 1) -> AudioSegment:
+        """
+        Render the track to a stereo audio segment.
+
+        With more than one worker, chunks of the track are synthesized concurrently
+        in a shared pool of processes. The output is identical to rendering serially.
+        """
+        return to_segment(self.render_samples(workers), self.sample_rate, channels=2)
+
+    def render_samples(self, workers: int = 1) -> np.ndarray:
+        """Render the track to interleaved stereo samples."""
+        bus = MixBus(2 * self.n_samples)
+        executor = process_pool(workers) if workers > 1 else None
+        samples = self.render_loop(executor=executor)
+        self.mix_into(bus, samples, channels=2)
+        return bus.normalize()
+
+    def render_loop(
+        self,
+        executor: Executor | None = None,
+        progress: Callable[[], None] | None = None,
+    ) -> np.ndarray:
+        """
+        Render one loop of the track to mono samples.
+
+        The samples exclude the track's offset, volume, and pan, which are applied
+        when the loop is mixed. With an executor, the loop is split into chunks at
+        note boundaries that are synthesized concurrently, on multiple cores with a
+        process pool. `progress` is called after each chunk, and can raise to stop
+        rendering.
+        """
+        if self._rendered is not None:
+            return self._rendered
+
+        return self._get_timeline().render(
+            self.instrument.synthesize,
+            reuse=self.instrument.cacheable,
+            executor=executor,
+            progress=progress,
+        )
+
+    def render_mono(self) -> np.ndarray:
+        """
+        Render the whole track to mono samples, before volume and pan are applied.
+
+        Every loop is copied into the result, so mixing reads `render_loop` instead.
+        """
+        samples = self.render_loop()
+        if self.loop > 1:
+            samples = np.tile(samples, self.loop)
 
         if self.offset > 0:
             # Add silence to the beginning of the track
-            offset_ms = Duration(self.offset, 16).to_millis(self.bpm)
-            offset_segment = self.instrument(None, duration=offset_ms)
-            segment = offset_segment + segment
+            offset = np.zeros(self.offset_samples, dtype=samples.dtype)
+            samples = np.concatenate([offset, samples])
+
+        return samples
+
+    def mix_into(self, bus: MixBus, samples: np.ndarray, channels: int = 2) -> None:
+        """Add one rendered loop of the track to a bus, repeating it for each loop."""
+        bus.add(
+            samples,
+            gains=self.channel_gains(channels),
+            start=self.offset_samples,
+            repeat=self.loop,
+        )
+
+    def use_rendered(self, samples: np.ndarray) -> None:
+        """Use one previously rendered loop instead of synthesizing the track."""
+        self._rendered = samples
+
+    def render_block(self, start: int, stop: int) -> np.ndarray:
+        """
+        Render a span of the track to mono samples, before volume and pan.
+
+        Only notes that overlap the span are synthesized. Samples outside of the
+        track are silent.
+        """
+        samples = np.zeros(stop - start, dtype=np.int16)
+        if (rendered := self._rendered) is not None:
+            length = len(rendered)
+
+            def read(loop_start: int, loop_stop: int) -> np.ndarray:
+                return rendered[loop_start:loop_stop]
+
+        else:
+            timeline = self._get_timeline()
+            length = len(timeline)
+
+            def read(loop_start: int, loop_stop: int) -> np.ndarray:
+                return timeline.render_block(
+                    loop_start, loop_stop, self.instrument.synthesize
+                )
+
+        # Read one loop cyclically to play loops without repeating audio or events
+        offset = self.offset_samples
+        end = min(stop, offset + length * self.loop)
+        position = max(start, offset)
+        while position < end:
+            loop_start = position - (position - offset) % length
+            span_stop = min(end, loop_start + length)
+            samples[position - start : span_stop - start] = read(
+                position - loop_start, span_stop - loop_start
+            )
+            position = span_stop
 
-        return segment
+        return samples
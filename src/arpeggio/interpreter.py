@@ -1,40 +1,89 @@
 """Convert an Arpeggio AST to a playable song."""
 
 import arpeggio.arp_ast as ast
-from arpeggio import engine
+from arpeggio import engine, profiling
+from arpeggio.engine.events import TICKS_PER_WHOLE
+from arpeggio.engine.song import PREVIEW_SAMPLE_RATE
 
 DEFAULT_KEY = "C_major"
 DEFAULT_INSTRUMENT = "sine"
 
 
-def interpret(parsed: ast.Song, filename: str = "<stdin>") -> engine.Song:
-    song = engine.Song.validate(parsed.config, filename=filename)
+def interpret(
+    parsed: ast.Song,
+    filename: str = "<stdin>",
+    *,
+    sample_rate: int | None = None,
+    preview: bool = False,
+) -> engine.Song:
+    """
+    Build a song from a parsed program.
 
-    for parsed_track in parsed.tracks:
-        track = engine.Track.validate(
-            parsed_track.config,
-            sample_rate=song.sample_rate,
+    A `sample_rate` overrides the rate set by the song. With `preview`, the song is
+    synthesized in mono at a reduced sample rate with cheaper instruments, and
+    resampled to its full sample rate when played.
+    """
+    with profiling.span("interpret"):
+        return _interpret(parsed, filename, sample_rate=sample_rate, preview=preview)
+
+
+def _interpret(
+    parsed: ast.Song, filename: str, *, sample_rate: int | None, preview: bool
+) -> engine.Song:
+    config = parsed.config
+    overrides = {}
+    if sample_rate is not None:
+        config = {k: v for k, v in config.items() if k != "sample_rate"}
+        overrides["sample_rate"] = sample_rate
+
+    with profiling.span("validate"):
+        song = engine.Song.validate(config, filename=filename, **overrides)
+
+    if preview:
+        song.preview = True
+        song.playback_rate = song.sample_rate
+        song.sample_rate = min(song.sample_rate, PREVIEW_SAMPLE_RATE)
+
+    for i, parsed_track in enumerate(parsed.tracks, start=1):
+        with profiling.span("validate"):
+            track = engine.Track.validate(
+                parsed_track.config,
+                sample_rate=song.sample_rate,
+                key=song.key,
+                bpm=song.bpm,
+                filename=filename,
+            )
+        track.label = f"track {i}"
+        # Seed each track differently, so noise tracks don't play identical noise
+        track.seed = i
+        track.preview = song.preview
+        # The seed only changes how random instruments sound. Leaving it out for
+        # the rest keeps their fingerprints stable when tracks are added or moved
+        seed = None if track.instrument_type.cacheable else track.seed
+        track.fingerprint = parsed_track.fingerprint(
             key=song.key,
             bpm=song.bpm,
-            filename=filename,
+            sample_rate=song.sample_rate,
+            seed=seed,
+            preview=track.preview,
         )
         song.tracks.append(track)
 
-        symbols = [s for line in parsed_track.lines for s in line]
-        for symbol, duration in symbols:
-            if isinstance(symbol, ast.Rest):
-                track.rest(
-                    duration=engine.note.Duration(
-                        duration.numerator, duration.denominator
-                    )
-                )
-            elif isinstance(symbol, ast.Interval):
-                track.play(
-                    interval=symbol.value,
-                    octave=symbol.octave,
-                    duration=engine.note.Duration(
-                        duration.numerator, duration.denominator
-                    ),
-                )
+        # Collect each column of a line's events, then add them all at once
+        for line in parsed_track.lines:
+            intervals, durations, octaves, rests = [], [], [], []
+            for symbol, duration in line.symbols:
+                if isinstance(symbol, ast.Rest):
+                    intervals.append(0)
+                    octaves.append(0)
+                else:
+                    intervals.append(symbol.value)
+                    octaves.append(symbol.octave)
+                durations.append(int(duration * TICKS_PER_WHOLE))
+                rests.append(isinstance(symbol, ast.Rest))
+
+            track.extend(
+                intervals, durations, octaves=octaves, rests=rests, repeat=line.repeat
+            )
 
     return song
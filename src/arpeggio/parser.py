@@ -1,22 +1,37 @@
 """Parse Arpeggio source code into an AST."""
 
+from functools import cache
+
 from lark import Lark, UnexpectedCharacters, UnexpectedToken
 from lark.tree import Meta
 
 import arpeggio.arp_ast as ast
+from arpeggio import profiling
 from arpeggio.exceptions import ParserError
 
 
+@cache
+def _get_lark() -> Lark:
+    """
+    Build the Lark parser once per process.
+
+    The LALR tables are also cached on disk by Lark, keyed by the grammar and Lark
+    version, so new processes can load them instead of rebuilding them.
+    """
+    return Lark.open_from_package(
+        "arpeggio",
+        "arpeggio.lark",
+        start="song",
+        parser="lalr",
+        propagate_positions=True,
+        cache=True,
+    )
+
+
 class Parser:
     def __init__(self):
         self.transformer = ast.get_transformer()
-        self.parser = Lark.open_from_package(
-            "arpeggio",
-            "arpeggio.lark",
-            start="song",
-            parser="lalr",
-            propagate_positions=True,
-        )
+        self.parser = _get_lark()
 
     def parser_error(
         self, e: UnexpectedToken | UnexpectedCharacters, filename: str
@@ -39,7 +54,8 @@ class Parser:
         """Parse an Arpeggio program and return the AST."""
         source += "\n"
 
-        self.tree = self.parser.parse(
-            source, on_error=lambda e: self.parser_error(e, filename)
-        )
-        return self.transformer.transform(self.tree)
+        with profiling.span("parse"):
+            self.tree = self.parser.parse(
+                source, on_error=lambda e: self.parser_error(e, filename)
+            )
+            return self.transformer.transform(self.tree)
@@ -0,0 +1,178 @@
+"""
+Record the time and memory used by each stage of rendering a song.
+
+Profiling is off unless a profiler is active, in which case every stage that runs in
+the same context reports to it:
+
+    with profile() as profiler:
+        song = interpret(Parser().parse(source))
+        song.render()
+
+    print(profiler.summary())
+    profiler.write_trace("trace.json")
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TextIO
+
+_active: contextvars.ContextVar[Profiler | None] = contextvars.ContextVar(
+    "profiler", default=None
+)
+
+
+@dataclass
+class Span:
+    """A timed stage of rendering."""
+
+    name: str
+    """What ran, like a stage or track."""
+
+    category: str
+    """The kind of work, used to group spans."""
+
+    start: float
+    """Wall-clock start time in seconds, relative to the profiler's start."""
+
+    wall: float = 0.0
+    """Elapsed wall-clock time in seconds."""
+
+    cpu: float = 0.0
+    """CPU time used by the whole process while the span was open, in seconds."""
+
+    peak_memory: int = 0
+    """The most memory traced while the span was open, in bytes."""
+
+    thread: int = field(default_factory=threading.get_ident)
+    """The thread that ran the span."""
+
+
+class Profiler:
+    """
+    Collect spans for the stages and tracks of a render.
+
+    Spans may be recorded from multiple threads. Peak memory is only measured while
+    tracemalloc is tracing, which slows rendering down.
+    """
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self._origin = time.perf_counter()
+        self._open: list[Span] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, category: str = "stage") -> Iterator[Span]:
+        """Record a span around a block of code."""
+        span = Span(name, category, start=time.perf_counter() - self._origin)
+        with self._lock:
+            self._track_peak()
+            self._open.append(span)
+
+        cpu = time.process_time()
+        try:
+            yield span
+        finally:
+            span.cpu = time.process_time() - cpu
+            span.wall = time.perf_counter() - self._origin - span.start
+            with self._lock:
+                self._track_peak()
+                self._open.remove(span)
+                self.spans.append(span)
+
+    def _track_peak(self) -> None:
+        """Attribute the peak memory so far to every open span, then reset it."""
+        if not tracemalloc.is_tracing():
+            return
+
+        _, peak = tracemalloc.get_traced_memory()
+        for span in self._open:
+            span.peak_memory = max(span.peak_memory, peak)
+        tracemalloc.reset_peak()
+
+    def summary(self) -> str:
+        """Summarize the spans, totaling those with the same name and category."""
+        totals: dict[tuple[str, str], list[Span]] = {}
+        for span in sorted(self.spans, key=lambda span: span.start):
+            totals.setdefault((span.category, span.name), []).append(span)
+
+        lines = [
+            f"{'stage':<28}{'calls':>7}{'wall ms':>11}{'cpu ms':>11}{'peak MiB':>10}"
+        ]
+        for (category, name), spans in totals.items():
+            label = name if category == "stage" else f"  {category}: {name}"
+            wall = 1000 * sum(span.wall for span in spans)
+            cpu = 1000 * sum(span.cpu for span in spans)
+            peak = max(span.peak_memory for span in spans) / 2**20
+            lines.append(
+                f"{label:<28}{len(spans):>7}{wall:>11.1f}{cpu:>11.1f}{peak:>10.1f}"
+            )
+
+        return "\n".join(lines)
+
+    def trace_events(self) -> list[dict]:
+        """Return the spans as complete events in the Chrome trace event format."""
+        return [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start * 1e6,
+                "dur": span.wall * 1e6,
+                "pid": os.getpid(),
+                "tid": span.thread,
+                "args": {"cpu_ms": span.cpu * 1000, "peak_bytes": span.peak_memory},
+            }
+            for span in self.spans
+        ]
+
+    def write_trace(self, file: str | TextIO) -> None:
+        """Write a trace that can be opened in Perfetto or chrome://tracing."""
+        trace = {"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}
+        if isinstance(file, str):
+            with open(file, "w") as f:
+                json.dump(trace, f)
+        else:
+            json.dump(trace, file)
+
+
+@contextmanager
+def profile(memory: bool = True) -> Iterator[Profiler]:
+    """
+    Profile rendering within a block and yield the profiler.
+
+    With `memory`, tracemalloc is started for the block if it isn't already tracing.
+    """
+    profiler = Profiler()
+    start_tracing = memory and not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+
+    token = _active.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _active.reset(token)
+        if start_tracing:
+            tracemalloc.stop()
+
+
+@contextmanager
+def span(name: str, category: str = "stage") -> Iterator[Span | None]:
+    """Record a span with the active profiler, if there is one."""
+    profiler = _active.get()
+    if profiler is None:
+        yield None
+        return
+
+    with profiler.span(name, category) as s:
+        yield s
@@ -0,0 +1,208 @@
+"""
+Serve renders over localhost HTTP from a long-running process.
+
+The server pays for imports and grammar construction once, and every request shares
+its warm parsers and waveform cache:
+
+    POST /render    Render the source in the request body to WAV.
+    GET /health     Check that the server is running.
+
+Rendering can be configured with query parameters, like
+`/render?format=raw&sample_rate=22050&preview=1`. Sources that fail to parse or
+validate are answered with `422` and a JSON description of the error, and any other
+error that stops a render is answered with `500`.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Literal
+from urllib.parse import parse_qs, urlsplit
+
+from arpeggio import __version__
+from arpeggio.exceptions import SourceError
+
+CONTENT_TYPES = {"wav": "audio/wav", "raw": "application/octet-stream"}
+
+
+class RenderServer(HTTPServer):
+    """
+    An HTTP server that renders songs with a bounded pool of worker threads.
+
+    Requests beyond the number of `workers` wait in a queue until a worker is free.
+    Each worker keeps its own parser, since parsers hold state while parsing. With
+    `verbose`, each request is logged to stderr.
+    """
+
+    def __init__(
+        self,
+        address: tuple[str, int] = ("127.0.0.1", 8000),
+        workers: int = 4,
+        verbose: bool = False,
+    ):
+        super().__init__(address, RenderHandler)
+        self.verbose = verbose
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="arpeggio-render"
+        )
+        self._local = threading.local()
+
+        # Pay for imports and grammar construction before the first request
+        import arpeggio.interpreter  # noqa: F401
+        from arpeggio.parser import _get_lark
+
+        _get_lark()
+
+    @property
+    def url(self) -> str:
+        host, port = self.socket.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def parser(self):
+        """The parser of the current worker, created on first use."""
+        if not hasattr(self._local, "parser"):
+            from arpeggio.parser import Parser
+
+            self._local.parser = Parser()
+        return self._local.parser
+
+    def process_request(self, request, client_address) -> None:
+        self.executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    server: RenderServer
+    server_version = f"arpeggio/{__version__}"
+
+    def do_GET(self) -> None:
+        if urlsplit(self.path).path != "/health":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Not found."})
+            return
+        self._send_json(HTTPStatus.OK, {"status": "ok", "version": __version__})
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+        if url.path != "/render":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Not found."})
+            return
+
+        try:
+            options = _render_options(parse_qs(url.query))
+        except ValueError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        source = self.rfile.read(length).decode("utf-8", errors="replace")
+
+        try:
+            audio = self.render(source, **options)
+        except SourceError as e:
+            self._send_json(HTTPStatus.UNPROCESSABLE_ENTITY, source_error_details(e))
+            return
+        except Exception as e:
+            # Answer unexpected errors too, rather than dropping the connection
+            self.log_error("Failed to render: %r", e)
+            self._send_json(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                {"error": type(e).__name__, "message": str(e)},
+            )
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", CONTENT_TYPES[options["format"]])
+        self.send_header("Content-Length", str(len(audio)))
+        self.end_headers()
+        self.wfile.write(audio)
+
+    def render(
+        self,
+        source: str,
+        filename: str = "<request>",
+        format: Literal["wav", "raw"] = "wav",
+        sample_rate: int | None = None,
+        preview: bool = False,
+    ) -> bytes:
+        """Render source to audio bytes, raising any errors in the source."""
+        from arpeggio.interpreter import interpret
+
+        parsed = self.server.parser.parse(source, filename=filename)
+        song = interpret(
+            parsed, filename=filename, sample_rate=sample_rate, preview=preview
+        )
+
+        file = io.BytesIO()
+        song.export(file, format=format)
+        return file.getvalue()
+
+    def _send_json(self, status: HTTPStatus, body: dict) -> None:
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def source_error_details(e: SourceError) -> dict:
+    """Describe an error in source code as JSON-serializable data."""
+    return {
+        "error": type(e).__name__,
+        "message": e.message,
+        "filename": getattr(e.meta, "filename", None),
+        "line": getattr(e.meta, "line", None),
+        "column": getattr(e.meta, "column", None),
+    }
+
+
+def _render_options(query: dict[str, list[str]]) -> dict:
+    """Read render options from query parameters, raising on invalid values."""
+    options: dict = {"format": query.get("format", ["wav"])[-1]}
+    if options["format"] not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported format {options['format']!r}.")
+
+    if "filename" in query:
+        options["filename"] = query["filename"][-1]
+    if "sample_rate" in query:
+        try:
+            options["sample_rate"] = int(query["sample_rate"][-1])
+        except ValueError:
+            raise ValueError("sample_rate must be an integer.") from None
+        if options["sample_rate"] <= 0:
+            raise ValueError("sample_rate must be positive.")
+    if "preview" in query:
+        options["preview"] = query["preview"][-1].lower() in ("1", "true", "yes")
+
+    return options
+
+
+def serve(host: str = "127.0.0.1", port: int = 8000, workers: int = 4) -> None:
+    """Serve renders until interrupted."""
+    with RenderServer((host, port), workers=workers, verbose=True) as server:
+        print(f"Serving renders at {server.url} (CTRL + C to exit)...")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("Exiting...")
@@ -0,0 +1,181 @@
+"""
+Re-render a file whenever it changes, cancelling renders of outdated versions.
+
+Each change starts a new cycle once the file has been quiet for a short debounce
+period. A change that arrives while a cycle is parsing, synthesizing, or playing
+cancels it right away, so only the latest version of the file is ever rendered.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from arpeggio.engine.playback import StreamPlayer
+
+
+class Cancelled(Exception):
+    """Raised to stop a cycle that was superseded by a newer change."""
+
+
+class Cycle:
+    """
+    One render of a watched file.
+
+    Renders should call `check` between stages and while synthesizing to stop as
+    soon as the cycle is cancelled. A player registered with `play_with` is stopped
+    on cancellation, and reports when the cycle is first heard.
+    """
+
+    def __init__(self, changed_at: float):
+        self.changed_at = changed_at
+        """The `time.perf_counter` time of the change that started the cycle."""
+
+        self.latency: float | None = None
+        """Seconds from the change until the render was heard or written."""
+
+        self._cancelled = threading.Event()
+        self._player: StreamPlayer | None = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Stop the cycle, including any playback."""
+        self._cancelled.set()
+        if self._player is not None:
+            self._player.stop()
+
+    def check(self, *_) -> None:
+        """Raise `Cancelled` if the cycle was cancelled. Accepts progress arguments."""
+        if self.cancelled:
+            raise Cancelled
+
+    def play_with(self, player: StreamPlayer) -> StreamPlayer:
+        """Register a player to stop on cancellation and to measure latency."""
+        player.on_start = lambda: self.finish("Playing")
+        self._player = player
+        if self.cancelled:
+            player.stop()
+        return player
+
+    def finish(self, action: str) -> None:
+        """Record and report how long the change took to be heard or written."""
+        self.latency = time.perf_counter() - self.changed_at
+        # Keep reports out of stdout, which may be carrying audio
+        print(
+            f"{action} {1000 * self.latency:.0f} ms after the change.", file=sys.stderr
+        )
+
+
+class Watcher:
+    """
+    Run a render cycle for the initial file and after every change to it.
+
+    Changes are debounced by `debounce` seconds, and renders run on a background
+    thread so that new changes can cancel them.
+    """
+
+    def __init__(
+        self, path: str, render: Callable[[Cycle], None], debounce: float = 0.1
+    ):
+        self.path = path
+        self.render = render
+        self.debounce = debounce
+        self.cycles = 0
+
+        self._changed = threading.Event()
+        self._changed_at = time.perf_counter()
+        self._last_mtime = _mtime(path)
+        self._cycle: Cycle | None = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def notify(self) -> None:
+        """Handle a modification event, cancelling the cycle in progress."""
+        # Saving a file can trigger multiple events. Ignore those with the same mtime
+        mtime = _mtime(self.path)
+        if mtime is None or mtime == self._last_mtime:
+            return
+
+        with self._lock:
+            self._last_mtime = mtime
+            self._changed_at = time.perf_counter()
+            if self._cycle is not None:
+                self._cycle.cancel()
+        self._changed.set()
+
+    def stop(self) -> None:
+        """Stop watching, cancelling the cycle in progress."""
+        self._stopped.set()
+        self._changed.set()
+        with self._lock:
+            if self._cycle is not None:
+                self._cycle.cancel()
+
+    def run(self) -> None:
+        """Render the file, then render it again after each change until stopped."""
+        self._changed.set()
+        while not self._stopped.is_set():
+            self._changed.wait()
+            # Wait for the file to be quiet before rendering it
+            while self._changed.is_set() and not self._stopped.is_set():
+                self._changed.clear()
+                time.sleep(self.debounce)
+            if self._stopped.is_set():
+                return
+
+            with self._lock:
+                cycle = self._cycle = Cycle(self._changed_at)
+            self.cycles += 1
+
+            with contextlib.suppress(Cancelled):
+                self.render(cycle)
+            if cycle.cancelled and not self._stopped.is_set():
+                print("Change detected, rendering the new version...", file=sys.stderr)
+
+
+def _mtime(path: str) -> float | None:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        # Some editors briefly remove files while saving them
+        return None
+
+
+def watch_file(path: str, render: Callable[[Cycle], None], debounce: float = 0.1):
+    """Render a file on every change until interrupted."""
+    from watchdog.events import FileModifiedEvent, FileSystemEventHandler
+    from watchdog.observers import Observer
+
+    watcher = Watcher(path, render, debounce=debounce)
+
+    class WatchedFileHandler(FileSystemEventHandler):
+        def on_modified(self, event: FileModifiedEvent) -> None:
+            watcher.notify()
+
+    observer = Observer()
+    observer.schedule(WatchedFileHandler(), path=path, event_filter=[FileModifiedEvent])
+    observer.start()
+
+    renderer = threading.Thread(target=watcher.run, daemon=True)
+    renderer.start()
+
+    print(f"Watching {path} for changes (CTRL + C to exit)...", file=sys.stderr)
+    try:
+        while observer.is_alive() and renderer.is_alive():
+            observer.join(1.0)
+    except KeyboardInterrupt:
+        print("Exiting...", file=sys.stderr)
+    finally:
+        watcher.stop()
+        observer.stop()
+        observer.join()
+        renderer.join()
@@ -0,0 +1,73 @@
+import asyncio
+import io
+
+import pytest
+
+import arpeggio
+from arpeggio.aio import start_render
+from arpeggio.exceptions import ParserError
+
+from .conftest import EXAMPLE_SONGS
+
+# A song that takes much longer to render than the timeouts used below
+LONG_SONG = "@bpm 30\ntrack\n@chords\n| 1 3 5 1+ 4 6 2 7 [x400]\nend"
+
+
+def test_render_async_matches_export():
+    source = EXAMPLE_SONGS["twinkle_twinkle"]
+    rendered = asyncio.run(arpeggio.render_async(source))
+
+    expected = io.BytesIO()
+    parsed = arpeggio.parser.Parser().parse(source)
+    arpeggio.interpreter.interpret(parsed).export(expected)
+    assert rendered == expected.getvalue()
+
+
+def test_render_async_raises_source_errors():
+    with pytest.raises(ParserError):
+        asyncio.run(arpeggio.render_async("track\n| 1 2 x\nend"))
+
+
+def test_progress_updates():
+    async def render():
+        task = start_render(EXAMPLE_SONGS["twinkle_twinkle"], block_size=1_000)
+        updates = [progress async for progress in task]
+        return updates, await task
+
+    updates, rendered = asyncio.run(render())
+
+    assert rendered[:4] == b"RIFF"
+    stages = [update.stage for update in updates]
+    assert stages[:3] == ["parse", "interpret", "render"]
+    assert stages[-1] == "done"
+    fractions = [update.fraction for update in updates if update.stage == "render"]
+    assert fractions == sorted(fractions)
+    assert fractions[-1] == 1.0
+
+
+def test_timeout_stops_synthesis():
+    async def render():
+        task = start_render(LONG_SONG, block_size=1_000)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(task, timeout=0.1)
+        return task
+
+    task = asyncio.run(render())
+    # The worker stopped before the timeout was raised, rather than running on
+    assert task.cancelled()
+    assert task.done()
+
+
+def test_cancel_stops_synthesis():
+    async def render():
+        task = start_render(LONG_SONG, block_size=1_000)
+        async for progress in task:
+            if progress.stage == "render" and progress.fraction > 0:
+                task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return task
+
+    task = asyncio.run(render())
+    assert task.done()
@@ -0,0 +1,125 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from arpeggio.engine.audio import (
+    MixBus,
+    normalize,
+    normalized_overlay,
+    pan_gains,
+    resample,
+    samples_of,
+    to_segment,
+    write_pcm,
+    write_wav,
+)
+
+
+def test_samples_of_does_not_copy():
+    segment = to_segment(np.arange(4), 8)
+    samples = samples_of(segment)
+
+    assert samples.tolist() == [0, 1, 2, 3]
+    assert not samples.flags.owndata
+
+
+def test_normalize_only_scales_clipping_signals():
+    quiet = np.array([-100.0, 0.0, 100.0], dtype=np.float32)
+    assert normalize(quiet).tolist() == [-100, 0, 100]
+
+    loud = np.array([-65534.0, 0.0, 32767.0], dtype=np.float32)
+    assert normalize(loud).tolist() == [-32767, 0, 16384]
+
+
+def test_normalize_rounds_consistently():
+    """Quiet and clipping signals should both round to the nearest sample."""
+    quiet = np.array([-1.6, -0.4, 0.6, 99.5], dtype=np.float32)
+    assert normalize(quiet).tolist() == [-2, 0, 1, 100]
+
+    loud = np.array([-65534.0, 3.4, 65534.0], dtype=np.float32)
+    assert normalize(loud).tolist() == [-32767, 2, 32767]
+
+
+def test_mix_bus_sums_in_float32():
+    bus = MixBus(4)
+    bus.add(np.full(4, 30_000, dtype=np.int16))
+    bus.add(np.full(2, 30_000, dtype=np.int16))
+
+    assert bus.samples.dtype == np.float32
+    assert bus.peak == 60_000
+    np.testing.assert_allclose(bus.normalize(), [32767, 32767, 16384, 16384], atol=1)
+
+
+def test_normalized_overlay_pads_shorter_segments():
+    long = to_segment(np.full(4, 10), 8)
+    short = to_segment(np.full(2, 5), 8)
+
+    overlaid = normalized_overlay([short, long])
+    assert samples_of(overlaid).tolist() == [15, 15, 10, 10]
+
+
+def test_mix_bus_repeats_without_copying():
+    """Repeated samples should mix the same as tiling them."""
+    loop = np.array([1, 2, 3], dtype=np.int16)
+    gains = np.array([1.0, 0.5], dtype=np.float32)
+
+    bus = MixBus(2 * 12)
+    bus.add(loop, gains=gains, start=2, repeat=4)
+
+    expected = MixBus(2 * 12)
+    expected.add(np.concatenate([[0, 0], np.tile(loop, 4)]), gains=gains)
+    np.testing.assert_array_equal(bus.samples, expected.samples)
+
+
+@pytest.mark.parametrize("pan", [-1.0, -0.3, 0.0, 0.5, 1.0])
+def test_pan_gains_match_pydub(pan: float):
+    mono = np.linspace(-20_000, 20_000, 101).astype(np.int16)
+    expected = samples_of(to_segment(mono, 8).pan(pan))
+
+    bus = MixBus(2 * len(mono))
+    bus.add(mono, gains=pan_gains(pan))
+    np.testing.assert_allclose(bus.normalize(), expected, atol=1)
+
+
+def test_write_wav_matches_wave_module():
+    blocks = [np.arange(6, dtype=np.int16), np.arange(-4, 0, dtype=np.int16)]
+
+    expected = io.BytesIO()
+    with wave.open(expected, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(11_025)
+        f.writeframes(np.concatenate(blocks).tobytes())
+
+    written = io.BytesIO()
+    write_wav(written, blocks, n_frames=5, sample_rate=11_025)
+    assert written.getvalue() == expected.getvalue()
+
+
+def test_write_pcm():
+    written = io.BytesIO()
+    write_pcm(written, [np.array([1, -1], dtype=np.int16), np.array([2.0, 3.0])])
+    assert np.frombuffer(written.getvalue(), dtype="<i2").tolist() == [1, -1, 2, 3]
+
+
+@pytest.mark.parametrize(("from_rate", "to_rate"), [(8_000, 11_025), (11_025, 8_000)])
+def test_resample_is_independent_of_blocks(from_rate, to_rate):
+    """Resampling should give the same frames however the input is split."""
+    frames = np.arange(2 * 1_000, dtype=np.int16)
+    whole = np.concatenate(
+        list(resample([frames], from_rate=from_rate, to_rate=to_rate))
+    )
+    split = np.concatenate(
+        list(
+            resample(
+                np.split(frames, [2 * 7, 2 * 300]), from_rate=from_rate, to_rate=to_rate
+            )
+        )
+    )
+
+    np.testing.assert_array_equal(split, whole)
+    assert len(whole) == 2 * -(-1_000 * to_rate // from_rate)
+    # Channels stay paired
+    np.testing.assert_array_equal(whole[1::2] - whole[::2], 1)
@@ -0,0 +1,108 @@
+import os
+import wave
+
+import pytest
+
+from arpeggio.batch import COMPILED, FAILED, SKIPPED, compile_batch
+
+from .conftest import EXAMPLE_SONGS
+
+
+@pytest.fixture
+def sources(tmp_path):
+    source_dir = tmp_path / "songs"
+    (source_dir / "nested").mkdir(parents=True)
+    (source_dir / "twinkle.arp").write_text(EXAMPLE_SONGS["twinkle_twinkle"])
+    (source_dir / "nested" / "birthday.arp").write_text(EXAMPLE_SONGS["happy_birthday"])
+    (source_dir / "broken.arp").write_text("track\n| 1 2 x\nend\n")
+    return source_dir
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_compile_batch(sources, tmp_path, jobs):
+    output_dir = tmp_path / "out"
+    results = list(compile_batch([str(sources)], output_dir, jobs=jobs))
+
+    statuses = {r.source.name: r.status for r in results}
+    assert statuses == {
+        "broken.arp": FAILED,
+        "birthday.arp": COMPILED,
+        "twinkle.arp": COMPILED,
+    }
+    assert "Unexpected token 'x'" in next(r.error for r in results if r.error)
+    with wave.open(str(output_dir / "nested" / "birthday.wav")) as f:
+        assert f.getnframes() > 0
+
+
+def test_compile_batch_skips_up_to_date(sources, tmp_path):
+    output_dir = tmp_path / "out"
+    pattern = str(sources / "*.arp")
+    list(compile_batch([pattern], output_dir, jobs=1))
+
+    statuses = {r.source.name: r.status for r in compile_batch([pattern], output_dir)}
+    assert statuses == {"broken.arp": FAILED, "twinkle.arp": SKIPPED}
+
+    # Edited sources and forced batches are compiled again
+    source = sources / "twinkle.arp"
+    os.utime(source, (source.stat().st_atime, source.stat().st_mtime + 10))
+    [result] = compile_batch([str(source)], output_dir)
+    assert result.status == COMPILED
+    [result] = compile_batch([str(source)], output_dir, force=True)
+    assert result.status == COMPILED
+
+
+def test_compile_batch_missing_pattern(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        list(compile_batch([str(tmp_path / "*.arp")], tmp_path))
+
+
+def test_compile_batch_mirrors_glob_matches(tmp_path):
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "song.arp").write_text("track\n| 1 2 3\nend\n")
+
+    output_dir = tmp_path / "out"
+    results = list(compile_batch([str(tmp_path / "*" / "song.arp")], output_dir))
+    assert [r.output for r in results] == [
+        output_dir / "a" / "song.wav",
+        output_dir / "b" / "song.wav",
+    ]
+
+    # Separate patterns can still collide, which would overwrite one output
+    with pytest.raises(ValueError, match="would both be compiled"):
+        list(
+            compile_batch(
+                [str(tmp_path / "a" / "song.arp"), str(tmp_path / "b" / "song.arp")],
+                output_dir,
+            )
+        )
+
+
+def test_compile_batch_reports_unexpected_errors(tmp_path, monkeypatch):
+    invalid = tmp_path / "invalid.arp"
+    invalid.write_text("track\n| . 1\nend\n")
+    undecodable = tmp_path / "undecodable.arp"
+    undecodable.write_bytes(b"\xff\xfe\xfa")
+    valid = tmp_path / "valid.arp"
+    valid.write_text("track\n| 1 2 3\nend\n")
+
+    results = list(compile_batch([str(tmp_path / "*.arp")], tmp_path / "out", jobs=1))
+    statuses = {r.source.name: r.status for r in results}
+    assert statuses == {
+        "invalid.arp": FAILED,
+        "undecodable.arp": FAILED,
+        "valid.arp": COMPILED,
+    }
+    assert "Cannot continue without a previous note" in results[0].error
+
+    # Failed exports don't leave partial outputs behind
+    def export(self, file, **kwargs):
+        with open(file, "wb") as f:
+            f.write(b"RIFF")
+        raise OSError("Disk full.")
+
+    monkeypatch.setattr("arpeggio.engine.song.Song.export", export)
+    [result] = compile_batch([str(valid)], tmp_path / "out", force=True)
+    assert result.status == FAILED
+    assert result.error == "OSError: Disk full."
+    assert not (tmp_path / "out" / "valid.wav.part").exists()
@@ -0,0 +1,172 @@
+import os
+
+import numpy as np
+import pytest
+
+import arpeggio
+from arpeggio.engine import cache as cache_module
+from arpeggio.engine.cache import DiskTrackCache, TrackCache, WaveformCache
+from arpeggio.engine.instrument import Noise, Sine
+from arpeggio.engine.note import Chord, Note
+
+
+def test_cache_counts_hits_and_misses():
+    cache = WaveformCache()
+    cache.get("a", lambda: np.zeros(10))
+    cache.get("a", lambda: np.zeros(10))
+    cache.get("b", lambda: np.zeros(10))
+
+    info = cache.info()
+    assert (info.hits, info.misses, info.entries) == (1, 2, 2)
+    assert info.nbytes == 2 * np.zeros(10).nbytes
+
+
+def test_cache_evicts_least_recently_used():
+    cache = WaveformCache(max_bytes=2 * np.zeros(10).nbytes)
+    cache.get("a", lambda: np.zeros(10))
+    cache.get("b", lambda: np.zeros(10))
+    # Use "a" so that "b" becomes the least recently used
+    cache.get("a", lambda: np.zeros(10))
+    cache.get("c", lambda: np.zeros(10))
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+    cache.resize(0)
+    assert len(cache) == 0
+
+
+def test_cached_waveforms_are_read_only():
+    cache = WaveformCache()
+    waveform = cache.get("a", lambda: np.zeros(10))
+
+    with pytest.raises(ValueError, match="read-only"):
+        waveform[0] = 1
+
+
+def test_instrument_uses_cache():
+    cache = WaveformCache()
+    sine = Sine(sample_rate=8_000, cache=cache)
+
+    note = sine.synthesize(Note(440.0), 100)
+    assert sine.synthesize(Note(440.0), 100) is note
+    sine.synthesize(Chord([Note(440.0), Note(550.0)]), 100)
+    sine.synthesize(Note(440.0), 100, volume=-3.0)
+
+    assert cache.info().hits == 1
+    assert cache.info().misses == 3
+
+
+def test_noise_is_not_cached():
+    cache = WaveformCache()
+    noise = Noise(sample_rate=8_000, cache=cache)
+    noise.synthesize(Note(440.0), 100)
+
+    assert len(cache) == 0
+
+
+def test_track_cache_renders_changed_tracks():
+    """Only tracks that changed since the last render should be synthesized."""
+    parser = arpeggio.parser.Parser()
+    source = "track\n| 1 2 3 4\nend\ntrack\n@instrument square\n| 5 6 7 8\nend"
+    edited = source.replace("5 6", "6 5")
+    cache = TrackCache()
+
+    song = arpeggio.interpreter.interpret(parser.parse(source))
+    rendered = song.render(cache=cache)
+    assert len(cache) == 2
+    unchanged = cache.get(song.tracks[0].fingerprint)
+
+    song = arpeggio.interpreter.interpret(parser.parse(edited))
+    cache.retain(track.fingerprint for track in song.tracks)
+    assert len(cache) == 1
+
+    assert (
+        song.render(cache=cache)
+        == arpeggio.interpreter.interpret(parser.parse(edited)).render()
+    )
+    assert song.render(cache=cache) != rendered
+    assert song.tracks[0].render_mono() is unchanged
+
+
+def test_track_fingerprints_ignore_position():
+    """Adding a track shouldn't change the fingerprints of tonal tracks after it."""
+    parser = arpeggio.parser.Parser()
+    source = "track\n| 1 2 3 4\nend\ntrack\n@instrument noise\n| 5 6\nend"
+    song = arpeggio.interpreter.interpret(parser.parse(source))
+    inserted = arpeggio.interpreter.interpret(
+        parser.parse("track\n| 1\nend\n" + source)
+    )
+
+    assert inserted.tracks[1].fingerprint == song.tracks[0].fingerprint
+    # Noise sounds different with each seed, so it's cached separately
+    assert inserted.tracks[2].fingerprint != song.tracks[1].fingerprint
+
+
+def test_track_cache_stores_one_loop():
+    """Looped tracks should be cached once, not once per loop."""
+    parser = arpeggio.parser.Parser()
+    source = "track\n@loop 50\n@offset 2\n| 1 2 3 4\nend\ntrack\n| 5\nend"
+    cache = TrackCache()
+
+    song = arpeggio.interpreter.interpret(parser.parse(source))
+    rendered = song.render(cache=cache)
+
+    looped = song.tracks[0]
+    loop_samples = (looped.n_samples - looped.offset_samples) // 50
+    assert len(cache.get(looped.fingerprint)) == loop_samples
+    assert song.render(cache=cache) == rendered
+    np.testing.assert_array_equal(
+        np.concatenate(list(song.iter_blocks(block_size=1_000, cache=cache))),
+        np.frombuffer(rendered.raw_data, dtype=np.int16),
+    )
+
+
+def test_disk_cache_persists_memory_mapped_tracks(tmp_path):
+    samples = np.arange(100, dtype=np.int16)
+    DiskTrackCache(tmp_path).put("a", samples)
+
+    cached = DiskTrackCache(tmp_path).get("a")
+    assert isinstance(cached, np.memmap)
+    np.testing.assert_array_equal(cached, samples)
+    assert DiskTrackCache(tmp_path).get("b") is None
+
+
+def test_disk_cache_is_keyed_by_version(tmp_path, monkeypatch):
+    DiskTrackCache(tmp_path).put("a", np.zeros(10, dtype=np.int16))
+
+    monkeypatch.setattr(cache_module, "__version__", "0.0.0-other")
+    assert "a" not in DiskTrackCache(tmp_path)
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    samples = np.zeros(100, dtype=np.int16)
+    cache = DiskTrackCache(tmp_path)
+    cache.put("a", samples)
+    cache.max_bytes = 2 * cache.info().nbytes
+
+    cache.put("b", samples)
+    # Make "b" the least recently used, regardless of file time resolution
+    os.utime(cache._path("b"), (0, 0))
+    cache.get("a")
+    cache.put("c", samples)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.info().nbytes <= cache.max_bytes
+
+
+def test_song_loads_tracks_from_disk_cache(tmp_path):
+    """Tracks rendered in an earlier run should be loaded instead of synthesized."""
+    parser = arpeggio.parser.Parser()
+    source = "track\n@loop 4\n| 1 2 3 4\nend\ntrack\n@instrument square\n| 5 6\nend"
+    expected = arpeggio.interpreter.interpret(parser.parse(source)).render()
+
+    first = arpeggio.interpreter.interpret(parser.parse(source))
+    assert first.render(cache=DiskTrackCache(tmp_path)) == expected
+
+    song = arpeggio.interpreter.interpret(parser.parse(source))
+    assert song.render(cache=DiskTrackCache(tmp_path)) == expected
+    assert all(isinstance(track.render_loop(), np.memmap) for track in song.tracks)
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from pydub import generators
+
+from arpeggio.engine import instrument
+from arpeggio.engine.note import Chord, Note
+
+SAMPLE_RATE = 11_025
+
+
+@pytest.mark.parametrize(
+    ("name", "generator"),
+    [
+        ("sine", generators.Sine),
+        ("square", generators.Square),
+        ("sawtooth", generators.Sawtooth),
+        ("triangle", generators.Triangle),
+    ],
+)
+@pytest.mark.parametrize("frequency", [55.0, 261.63, 1760.0])
+def test_oscillators_match_pydub(name, generator, frequency):
+    """Vectorized oscillators should match pydub's generators to within one step."""
+    instr = instrument.get_instrument(name)(sample_rate=SAMPLE_RATE)
+    expected = generator(frequency, sample_rate=SAMPLE_RATE).to_audio_segment(
+        1000, volume=-3.0
+    )
+
+    samples = instr.synthesize(Note(frequency), SAMPLE_RATE, volume=-3.0)
+    expected_samples = np.array(expected.get_array_of_samples())
+
+    np.testing.assert_allclose(samples, expected_samples, atol=1, rtol=0)
+
+
+def test_noise_is_deterministic():
+    """Noise should depend only on the seed and note position."""
+    noise = instrument.Noise(sample_rate=SAMPLE_RATE, seed=1)
+    samples = noise.synthesize(Note(440.0), 1_000, position=12)
+
+    assert np.abs(samples).max() > 0
+    assert noise.synthesize(Note(440.0), 1_000, position=24).tolist() != (
+        samples.tolist()
+    )
+    assert (
+        instrument.Noise(sample_rate=SAMPLE_RATE, seed=2)
+        .synthesize(Note(440.0), 1_000, position=12)
+        .tolist()
+        != samples.tolist()
+    )
+
+    # Other noise synthesized in between doesn't change the result
+    noise.synthesize(Note(440.0), 500, position=0)
+    again = instrument.Noise(sample_rate=SAMPLE_RATE, seed=1).synthesize(
+        Note(440.0), 1_000, position=12
+    )
+    assert again.tolist() == samples.tolist()
+
+
+@pytest.mark.parametrize("name", ["sine", "square", "sawtooth", "triangle"])
+def test_wavetable_approximates_source(name):
+    """Wavetable oscillators should stay close to the instrument they imitate."""
+    source = instrument.get_instrument(name)
+    exact = source(sample_rate=SAMPLE_RATE).synthesize(Note(261.63), SAMPLE_RATE)
+    preview = instrument.Wavetable(source, sample_rate=SAMPLE_RATE)
+    approx = preview.synthesize(Note(261.63), SAMPLE_RATE)
+
+    # Sharp edges may land one sample early or late, so compare the overall error
+    error = np.abs(approx.astype(float) - exact) / np.abs(exact).max()
+    assert error.mean() < 0.02
+
+
+@pytest.mark.parametrize(
+    ("name", "preview_type"),
+    [("sine", instrument.Wavetable), ("noise", instrument.Noise)],
+)
+def test_preview_tables_only_oscillators(name, preview_type):
+    """Previews should only use wavetables for instruments with a waveform."""
+    source = instrument.get_instrument(name)
+    preview = instrument.preview_instrument(source, sample_rate=SAMPLE_RATE)
+    assert type(preview) is preview_type
+
+
+@pytest.mark.parametrize("name", ["sine", "square", "sawtooth", "triangle"])
+def test_chords_average_their_notes(name):
+    """Chords should mix their notes with a fixed gain instead of normalizing."""
+    instr = instrument.get_instrument(name)(sample_rate=SAMPLE_RATE, cache=None)
+    notes = [Note(261.63), Note(329.63), Note(392.0)]
+
+    chord = instr.synthesize(Chord(notes), 2_000, volume=-3.0)
+    expected = np.mean(
+        [instr.synthesize(note, 2_000, volume=-3.0) for note in notes], axis=0
+    )
+
+    np.testing.assert_allclose(chord, expected, atol=2, rtol=0)
@@ -1,8 +1,12 @@
+import io
+import wave
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 import arpeggio
+import arpeggio.engine.song
 from arpeggio.exceptions import ConfigError
 
 from .conftest import EXAMPLE_SONGS
@@ -24,10 +28,100 @@ def test_interpret_example_songs(source: str, ndarrays_regression):
     ndarrays_regression.check(
         {
             "rendered": rendered.get_array_of_samples(),
-        }
+        },
+        # Allow one step of 16-bit quantization, since vectorized oscillators may
+        # round differently than scalar math on some platforms.
+        default_tolerance=dict(atol=1, rtol=0),
     )
 
 
+def test_parallel_render_matches_serial():
+    """Rendering tracks in a worker pool should not change the output."""
+    parser = arpeggio.parser.Parser()
+    source = EXAMPLE_SONGS["demo_song"]
+
+    serial = arpeggio.interpreter.interpret(parser.parse(source)).render()
+    parallel = arpeggio.interpreter.interpret(parser.parse(source)).render(workers=4)
+
+    assert parallel == serial
+
+
+def test_chunked_track_render_matches_serial(monkeypatch):
+    """Long noise tracks should be split into chunks when workers are left over."""
+    source = """
+    track
+        @instrument noise
+        | 1 3 & 5 . 4 . 2 & 6 1+ [x40]
+    end
+    """
+    song = arpeggio.interpreter.interpret(arpeggio.parser.Parser().parse(source))
+    track = song.tracks[0]
+
+    pools = []
+    process_pool = arpeggio.engine.song.process_pool
+    monkeypatch.setattr(
+        arpeggio.engine.song,
+        "process_pool",
+        lambda workers: pools.append(workers) or process_pool(workers),
+    )
+
+    np.testing.assert_array_equal(
+        track.render_samples(workers=2), track.render_samples()
+    )
+    assert song.render(workers=2) == song.render()
+    assert pools == [2]
+
+
+@pytest.mark.parametrize("block_size", [777, 2**16])
+def test_streaming_render_matches_render(block_size):
+    """Rendering in blocks should match rendering the whole song at once."""
+    source = """
+    @loop 2
+    track
+        @chords
+        @offset 3
+        @loop 3
+        | 1 . 4 & 5 . . 1 [x2]
+    end
+    track
+        @instrument square
+        @pan -0.5
+        @staccato
+        | 1 2 3 & 5 6 7 1+ 1 . . . . .
+    end
+    """
+    parser = arpeggio.parser.Parser()
+    song = arpeggio.interpreter.interpret(parser.parse(source))
+
+    rendered = np.frombuffer(song.render().raw_data, dtype=np.int16)
+    blocks = list(song.iter_blocks(block_size=block_size))
+    np.testing.assert_array_equal(np.concatenate(blocks), rendered)
+
+    output = io.BytesIO()
+    song.export(output, block_size=block_size)
+    output.seek(0)
+    with wave.open(output) as f:
+        assert f.getnchannels() == 2
+        assert f.getframerate() == song.sample_rate
+        exported = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+    np.testing.assert_array_equal(exported, rendered)
+
+
+def test_noise_is_reproducible():
+    """Noise should sound the same however and whenever a song is rendered."""
+    parser = arpeggio.parser.Parser()
+    source = EXAMPLE_SONGS["demo_song"]
+
+    def interpret():
+        return arpeggio.interpreter.interpret(parser.parse(source))
+
+    rendered = np.frombuffer(interpret().render().raw_data, dtype=np.int16)
+    # Render other noise in between, which used to advance a shared random state
+    interpret().render()
+    streamed = np.concatenate(list(interpret().iter_blocks(block_size=1000)))
+    np.testing.assert_array_equal(streamed, rendered)
+
+
 @pytest.mark.parametrize("source", ["", "~ comment"])
 def test_interpret_empty_songs(source):
     """An empty program should interpret as silence."""
@@ -71,3 +165,23 @@ def test_invalid_config_errors():
     parsed = parser.parse("track\n@stuff\nend")
     with pytest.raises(ConfigError, match="Unrecognized configuration @stuff"):
         arpeggio.interpreter.interpret(parsed)
+
+
+def test_interpret_builds_event_table():
+    source = """
+@bpm 120
+
+track
+    @chords
+    | 1 . & 3 [x2]
+end
+"""
+    song = arpeggio.interpreter.interpret(arpeggio.parser.Parser().parse(source))
+    events = song.tracks[0].events
+
+    # Sixteenth notes last 12 ticks, and rests aren't stored as events
+    assert events.start.tolist() == [0, 36, 48, 84]
+    assert events.duration.tolist() == [24, 12, 24, 12]
+    assert events.length == 96
+    assert events.chord_size.tolist() == [3, 3, 3, 3]
+    assert events.playable(1) == song.key.chord(3)
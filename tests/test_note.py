@@ -17,3 +17,9 @@ def test_note_semitone_calculation():
     assert (note.Note(440) - 12) == 220
     # C1 plus 28 semitones is E3
     assert (note.Note(32.703) + 28) == pytest.approx(164.813, rel=1e5)
+
+
+def test_duration_to_samples():
+    assert note.Duration(1, 4).to_samples(bpm=60, sample_rate=8_000) == 8_000
+    assert note.Duration(1, 16).to_samples(bpm=120, sample_rate=11_025) == 1_378
+    assert note.Duration(3, 16).to_samples(bpm=120, sample_rate=11_025) == 4_134
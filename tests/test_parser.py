@@ -34,7 +34,18 @@ def test_parse_valid_program():
     track = song.tracks[0]
     assert track.config["instrument"].value == "sine"
     assert len(track.lines) == 3
-    assert len(track.lines[1]) == 5 * 3
+    assert len(track.lines[1].symbols) == 5
+    assert track.lines[1].repeat == 3
+
+
+def test_zero_repeats_play_once():
+    parser = arpeggio.parser.Parser()
+    zero, once = (
+        parser.parse(f"track\n| 1 2 . 3 {repeat}\nend").tracks[0].lines[0]
+        for repeat in ("[x0]", "")
+    )
+    assert zero == once
+    assert zero.repeat == 1
 
 
 def test_parse_whitespace():
@@ -62,3 +73,16 @@ def test_parser_error():
     msg = "<stdin>, line 5, column 9: Unexpected token '1'"
     with pytest.raises(ParserError, match=msg):
         parser.parse(invalid_prog)
+
+
+def test_track_fingerprint():
+    """Fingerprints should change with track content but not source position."""
+    parser = arpeggio.parser.Parser()
+    track = "track\n@instrument square\n| 1 2 & 3 . [x2]\nend"
+    moved = parser.parse("\n\n~ comment\n" + track).tracks[0]
+    original = parser.parse(track).tracks[0]
+    edited = parser.parse(track.replace("3", "4")).tracks[0]
+
+    assert original.fingerprint() == moved.fingerprint()
+    assert original.fingerprint() != edited.fingerprint()
+    assert original.fingerprint(bpm=120) != original.fingerprint(bpm=140)
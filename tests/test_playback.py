@@ -0,0 +1,90 @@
+import io
+import time
+import wave
+
+import numpy as np
+import pytest
+
+import arpeggio
+from arpeggio.engine.playback import FileSink, StreamPlayer
+
+SAMPLE_RATE = 1_000
+
+
+def _blocks(n: int, delay: float = 0.0):
+    for i in range(n):
+        time.sleep(delay)
+        yield np.full(2 * 100, i, dtype=np.int16)
+
+
+def _read_wav(file: io.BytesIO) -> np.ndarray:
+    file.seek(0)
+    with wave.open(file) as f:
+        return np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+
+
+def test_play_song_to_file():
+    """Playing a song should write the same samples as streaming it."""
+    source = "track\n@chords\n| 1 . 4 & 5 . . 1 [x4]\nend"
+    song = arpeggio.interpreter.interpret(arpeggio.parser.Parser().parse(source))
+
+    output = io.BytesIO()
+    stats = song.play(sink=FileSink(output), block_size=1_000)
+
+    expected = np.concatenate(list(song.iter_blocks(block_size=1_000)))
+    np.testing.assert_array_equal(_read_wav(output), expected)
+    assert stats.blocks == int(np.ceil(len(expected) / 2 / 1_000))
+
+
+def test_preview_plays_mono_at_the_song_sample_rate():
+    """Previews should be synthesized cheaply but played at the full sample rate."""
+    source = "track\n@chords\n| 1 . 4 & 5 . . 1 [x4]\nend"
+    parsed = arpeggio.parser.Parser().parse(source)
+    full = arpeggio.interpreter.interpret(parsed, sample_rate=16_000)
+    song = arpeggio.interpreter.interpret(parsed, sample_rate=16_000, preview=True)
+    assert song.sample_rate < song.playback_rate == 16_000
+
+    output = io.BytesIO()
+    song.play(sink=FileSink(output), block_size=1_000)
+
+    output.seek(0)
+    with wave.open(output) as f:
+        assert f.getnchannels() == 1
+        assert f.getframerate() == 16_000
+        assert f.getnframes() == full.tracks[0].n_samples
+
+
+def test_player_reports_underruns():
+    """Synthesis that is slower than real time should be reported."""
+    # Each 100-frame block lasts 0.1 seconds
+    player = StreamPlayer(FileSink(io.BytesIO(), realtime=True), prebuffer=1)
+    stats = player.play(_blocks(4, delay=0.2), sample_rate=SAMPLE_RATE)
+    assert stats.underruns > 0
+
+    player = StreamPlayer(FileSink(io.BytesIO(), realtime=True), prebuffer=1)
+    stats = player.play(_blocks(4), sample_rate=SAMPLE_RATE)
+    assert stats.underruns == 0
+    assert stats.blocks == 4
+
+
+def test_player_raises_synthesis_errors():
+    def failing_blocks():
+        yield from _blocks(1)
+        raise ValueError("synthesis failed")
+
+    player = StreamPlayer(FileSink(io.BytesIO()))
+    with pytest.raises(ValueError, match="synthesis failed"):
+        player.play(failing_blocks(), sample_rate=SAMPLE_RATE)
+
+
+def test_player_stop():
+    output = io.BytesIO()
+    player = StreamPlayer(FileSink(output, realtime=True), prebuffer=1)
+
+    def stopping_blocks():
+        yield from _blocks(2)
+        player.stop()
+        yield from _blocks(10)
+
+    stats = player.play(stopping_blocks(), sample_rate=SAMPLE_RATE)
+    assert stats.blocks < 12
@@ -0,0 +1,62 @@
+import io
+import json
+
+import arpeggio
+from arpeggio.profiling import Profiler, profile, span
+
+SOURCE = """
+track
+    | 1 2 3 4
+end
+
+track
+    @chords
+    | 1 . . . 5 . . .
+end
+"""
+
+
+def _render(workers: int = 1):
+    song = arpeggio.interpreter.interpret(arpeggio.parser.Parser().parse(SOURCE))
+    song.render(workers=workers)
+
+
+def test_span_without_profiler():
+    with span("parse") as s:
+        assert s is None
+
+
+def test_profile_records_stages_and_tracks():
+    with profile() as profiler:
+        _render()
+
+    names = {(s.category, s.name) for s in profiler.spans}
+    assert {("stage", "parse"), ("stage", "interpret"), ("stage", "validate")} <= names
+    assert {("synthesize", "track 1"), ("synthesize", "track 2")} <= names
+    assert ("stage", "normalize") in names
+    assert all(s.wall >= 0 and s.peak_memory > 0 for s in profiler.spans)
+    assert "synthesize: track 2" in profiler.summary()
+
+
+def test_profile_records_worker_threads():
+    with profile(memory=False) as profiler:
+        _render(workers=2)
+
+    tracks = [s for s in profiler.spans if s.category == "synthesize"]
+    assert sorted(s.name for s in tracks) == ["track 1", "track 2"]
+
+
+def test_write_trace():
+    profiler = Profiler()
+    with profiler.span("parse"), profiler.span("track 1", "synthesize"):
+        pass
+
+    file = io.StringIO()
+    profiler.write_trace(file)
+    events = json.loads(file.getvalue())["traceEvents"]
+
+    assert [(e["name"], e["cat"], e["ph"]) for e in events] == [
+        ("track 1", "synthesize", "X"),
+        ("parse", "stage", "X"),
+    ]
+    assert events[1]["dur"] >= events[0]["dur"]
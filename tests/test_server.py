@@ -0,0 +1,106 @@
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import arpeggio
+from arpeggio.server import RenderServer
+
+from .conftest import EXAMPLE_SONGS
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = RenderServer(("127.0.0.1", 0), workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def _post(server: RenderServer, source: str, query: str = ""):
+    request = urllib.request.Request(
+        f"{server.url}/render{query}", data=source.encode(), method="POST"
+    )
+    return urllib.request.urlopen(request, timeout=30)
+
+
+def test_health(server):
+    with urllib.request.urlopen(f"{server.url}/health", timeout=30) as response:
+        assert json.load(response)["status"] == "ok"
+
+
+def test_render_matches_export(server):
+    source = EXAMPLE_SONGS["twinkle_twinkle"]
+    with _post(server, source) as response:
+        assert response.headers["Content-Type"] == "audio/wav"
+        body = response.read()
+
+    expected = io.BytesIO()
+    parsed = arpeggio.parser.Parser().parse(source)
+    arpeggio.interpreter.interpret(parsed).export(expected)
+    assert body == expected.getvalue()
+
+
+def test_render_options(server):
+    with _post(server, "track\n| 1 2 3\nend", "?sample_rate=22050") as response:
+        body = response.read()
+
+    with wave.open(io.BytesIO(body)) as f:
+        assert f.getframerate() == 22_050
+        assert f.getnchannels() == 2
+
+
+def test_source_errors_are_structured(server):
+    with pytest.raises(urllib.error.HTTPError) as e:
+        _post(server, "track\n| 1 2 x\nend", "?filename=song.arp")
+
+    assert e.value.code == 422
+    details = json.load(e.value)
+    assert details["error"] == "ParserError"
+    assert details["filename"] == "song.arp"
+    assert (details["line"], details["column"]) == (2, 7)
+
+
+def test_unexpected_errors_are_answered(server):
+    with pytest.raises(urllib.error.HTTPError) as e:
+        _post(server, "track\n| . 1\nend")
+
+    assert e.value.code == 500
+    details = json.load(e.value)
+    assert "Cannot continue without a previous note" in details["message"]
+
+    # The server keeps serving after the error
+    with _post(server, "track\n| 1\nend") as response:
+        assert response.status == 200
+
+
+def test_invalid_options(server):
+    with pytest.raises(urllib.error.HTTPError) as e:
+        _post(server, "track\n| 1\nend", "?format=mp3")
+    assert e.value.code == 400
+
+
+def test_concurrent_requests(server):
+    """Requests rendered concurrently should each get their own song."""
+    sources = [f"@bpm {bpm}\ntrack\n| 1 3 5 1+\nend" for bpm in (60, 90, 120, 150)]
+
+    def render(source):
+        with _post(server, source, "?format=raw") as response:
+            return np.frombuffer(response.read(), dtype=np.int16)
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(render, sources))
+
+    assert [len(r) for r in results] == sorted((len(r) for r in results), reverse=True)
+    for source, result in zip(sources, results, strict=True):
+        song = arpeggio.interpreter.interpret(arpeggio.parser.Parser().parse(source))
+        np.testing.assert_array_equal(result, np.concatenate(list(song.iter_blocks())))
@@ -0,0 +1,28 @@
+import subprocess
+import sys
+
+import pytest
+
+from arpeggio.parser import Parser
+
+
+def _imported_modules(code: str) -> set[str]:
+    """Return the top-level modules imported by running code in a new process."""
+    script = f"{code}; import sys; print(' '.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    return {name.split(".")[0] for name in result.stdout.split()}
+
+
+@pytest.mark.parametrize(
+    "code", ["import arpeggio", "import arpeggio.__main__ as cli; cli._parse_args"]
+)
+def test_heavy_dependencies_are_lazy(code):
+    """Importing the package or CLI shouldn't import heavy dependencies."""
+    modules = _imported_modules(code)
+    assert not modules & {"numpy", "pydub", "pydantic", "watchdog", "lark"}
+
+
+def test_parser_is_built_once():
+    assert Parser().parser is Parser().parser
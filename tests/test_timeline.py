@@ -0,0 +1,130 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from arpeggio.engine.events import TICKS_PER_WHOLE, EventTable, ticks_to_samples
+from arpeggio.engine.instrument import Noise, Square
+from arpeggio.engine.note import Duration, Note
+from arpeggio.engine.timeline import Timeline
+
+
+def test_timeline_does_not_drift():
+    """Note boundaries should stay sample-accurate over many short notes."""
+    events = EventTable.empty()
+    events.length = Duration(1, 32).to_ticks(TICKS_PER_WHOLE)
+    timeline = Timeline([(events, 10_000)], bpm=120, sample_rate=11_025)
+
+    # 10,000 32nd notes at 120 bpm last exactly 625 seconds
+    assert len(timeline) == 625 * 11_025
+
+
+def test_ticks_to_samples_matches_durations():
+    for fraction in [(1, 16), (3, 16), (5, 8), (7, 4)]:
+        duration = Duration(*fraction)
+        ticks = duration.to_ticks(TICKS_PER_WHOLE)
+        assert ticks_to_samples(ticks, bpm=97, sample_rate=11_025) == (
+            duration.to_samples(97, 11_025)
+        )
+
+
+def _single_note(duration: int, length: int) -> EventTable:
+    return EventTable(
+        start=np.array([0]),
+        duration=np.array([duration]),
+        frequency=np.array([[440.0, np.nan, np.nan]]),
+        chord_size=np.array([1]),
+        length=length,
+    )
+
+
+def test_timeline_render():
+    timeline = Timeline([(_single_note(48, 96), 1)], bpm=60, sample_rate=8)
+
+    assert timeline.segments[0][0].playable(0) == Note(440.0)
+    rendered = timeline.render(lambda _, n_samples, position: np.ones(n_samples))
+    assert rendered.tolist() == [1] * 8 + [0] * 8
+    block = timeline.render_block(4, 12, lambda _, n, position: np.arange(n))
+    assert block.tolist() == [4, 5, 6, 7, 0, 0, 0, 0]
+
+
+def test_timeline_renders_repeats_once():
+    """Repetitions should only be synthesized once per distinct sample rounding."""
+    calls = []
+
+    def synthesize(_, n_samples, position):
+        calls.append(n_samples)
+        return np.arange(1, n_samples + 1)
+
+    # Each repetition lasts 2.5 samples, so repetitions alternate between 2 and 3
+    timeline = Timeline([(_single_note(9, 15), 10_000)], bpm=60, sample_rate=8)
+    rendered = timeline.render(synthesize)
+
+    assert len(rendered) == 25_000
+    assert sorted(calls) == [1, 2]
+    assert rendered[:10].tolist() == [1, 0, 1, 2, 0, 1, 0, 1, 2, 0]
+    assert timeline.render_block(3, 13, synthesize).tolist() == rendered[3:13].tolist()
+
+
+def _varied_notes(n_notes: int) -> EventTable:
+    rng = np.random.default_rng(0)
+    duration = rng.integers(1, 40, n_notes)
+    frequency = np.full((n_notes, 3), np.nan)
+    frequency[:, 0] = rng.uniform(100, 1_000, n_notes)
+    return EventTable(
+        start=np.concatenate([[0], np.cumsum(duration)[:-1]]),
+        duration=duration,
+        frequency=frequency,
+        chord_size=np.ones(n_notes, dtype=int),
+        length=int(duration.sum()),
+    )
+
+
+@pytest.mark.parametrize("reuse", [True, False])
+@pytest.mark.parametrize("chunk_size", [1, 37, 2**16])
+def test_chunked_render_matches_serial(reuse, chunk_size):
+    """Rendering chunks concurrently should be seamless, even at tiny chunk sizes."""
+
+    def synthesize(note, n_samples, position):
+        return np.arange(position, position + n_samples) % int(note)
+
+    timeline = Timeline(
+        [(_varied_notes(200), 3), (_single_note(9, 15), 7)], bpm=97, sample_rate=800
+    )
+    serial = timeline.render(synthesize, reuse=reuse)
+    with ThreadPoolExecutor(4) as executor:
+        chunked = timeline.render(
+            synthesize, reuse=reuse, executor=executor, chunk_size=chunk_size
+        )
+
+    np.testing.assert_array_equal(chunked, serial)
+
+
+@pytest.mark.parametrize("instrument_type", [Square, Noise])
+def test_process_pool_render_matches_serial(instrument_type):
+    """Instruments should synthesize identical chunks in other processes."""
+    instrument = instrument_type(sample_rate=800, seed=3)
+    timeline = Timeline([(_varied_notes(200), 3)], bpm=97, sample_rate=800)
+    serial = timeline.render(instrument.synthesize, reuse=instrument.cacheable)
+    with ProcessPoolExecutor(2) as executor:
+        chunked = timeline.render(
+            instrument.synthesize,
+            reuse=instrument.cacheable,
+            executor=executor,
+            chunk_size=500,
+        )
+
+    np.testing.assert_array_equal(chunked, serial)
+
+
+def test_chunks_split_at_note_boundaries():
+    timeline = Timeline([(_varied_notes(200), 1)], bpm=97, sample_rate=800)
+    starts, _ = timeline._placement(0)
+    chunks = timeline._chunks(0, len(timeline), 100)
+
+    assert len(chunks) > 1
+    assert chunks[0][1] == 0
+    assert chunks[-1][2] == len(timeline)
+    for (_, _, stop), (_, start, _) in zip(chunks, chunks[1:], strict=False):
+        assert stop == start
+        assert start in starts
@@ -0,0 +1,123 @@
+import io
+import os
+import threading
+import time
+
+import pytest
+
+import arpeggio
+from arpeggio.engine.cache import TrackCache
+from arpeggio.engine.playback import FileSink, StreamPlayer
+from arpeggio.watch import Cancelled, Cycle, Watcher
+
+
+def _touch(path, mtime: float) -> None:
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "song.arp"
+    path.write_text("track\n| 1 2 3\nend\n")
+    _touch(path, 1_000)
+    return path
+
+
+def _run(watcher: Watcher) -> threading.Thread:
+    thread = threading.Thread(target=watcher.run, daemon=True)
+    thread.start()
+    return thread
+
+
+def _wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "Timed out waiting for condition."
+        time.sleep(0.005)
+
+
+def test_changes_are_debounced(source):
+    rendered = []
+    watcher = Watcher(str(source), rendered.append, debounce=0.05)
+    thread = _run(watcher)
+    _wait_for(lambda: len(rendered) == 1)
+
+    # A burst of saves renders once, and duplicate events are ignored
+    for mtime in range(1_001, 1_006):
+        _touch(source, mtime)
+        watcher.notify()
+        watcher.notify()
+    _wait_for(lambda: len(rendered) == 2)
+    time.sleep(0.2)
+
+    watcher.stop()
+    thread.join()
+    assert len(rendered) == 2
+
+
+def test_changes_cancel_the_cycle_in_progress(source):
+    cycles = []
+
+    def render(cycle: Cycle):
+        cycles.append(cycle)
+        # The first cycle renders until it's cancelled
+        while len(cycles) == 1:
+            cycle.check()
+            time.sleep(0.001)
+
+    watcher = Watcher(str(source), render, debounce=0.01)
+    thread = _run(watcher)
+    _wait_for(lambda: len(cycles) == 1)
+
+    _touch(source, 1_001)
+    watcher.notify()
+    _wait_for(lambda: len(cycles) == 2)
+
+    watcher.stop()
+    thread.join()
+    assert cycles[0].cancelled
+    assert cycles[1].changed_at > cycles[0].changed_at
+
+
+def test_cancel_stops_synthesis_and_playback():
+    source = "@bpm 30\ntrack\n| 1 2 3 4 5 6 7 1+ [x100]\nend"
+    song = arpeggio.interpreter.interpret(arpeggio.parser.Parser().parse(source))
+
+    cycle = Cycle(time.perf_counter())
+    player = cycle.play_with(StreamPlayer(FileSink(io.BytesIO(), realtime=True)))
+    threading.Timer(0.2, cycle.cancel).start()
+
+    def play():
+        song.play(player=player, block_size=1_000, progress=cycle.check)
+        # Playback may stop before synthesis notices the cancellation
+        cycle.check()
+
+    start = time.perf_counter()
+    with pytest.raises(Cancelled):
+        play()
+
+    assert time.perf_counter() - start < 2.0
+    assert cycle.latency is not None
+    assert cycle.latency < 0.2
+
+
+def test_cancel_stops_cached_synthesis_within_a_track():
+    """Watch mode caches tracks, which shouldn't delay cancellation until they end."""
+    source = "track\n@instrument noise\n| 1 2 3 4 5 6 7 1+ [x400]\nend"
+    song = arpeggio.interpreter.interpret(arpeggio.parser.Parser().parse(source))
+    cache = TrackCache()
+    cycle = Cycle(time.perf_counter())
+    checks = 0
+
+    def check(*_):
+        nonlocal checks
+        checks += 1
+        if checks == 2:
+            cycle.cancel()
+        cycle.check()
+
+    with pytest.raises(Cancelled):
+        song.export(io.BytesIO(), cache=cache, progress=check)
+
+    # The only track was stopped before it finished rendering
+    assert len(cache) == 0